@@ -37,7 +37,7 @@ export default function SOSMonitorPage() {
     // Load SOS alerts from API
     const loadAlerts = async () => {
       try {
-        const response = await apiClient.getSOSAlerts()
+        const response = await apiClient.getAllSOSAlerts()
         setAlerts(response.data?.alerts || [])
         setFilteredAlerts(response.data?.alerts || [])
 
@@ -55,23 +55,90 @@ export default function SOSMonitorPage() {
 
     loadAlerts()
 
-    // Set up long polling for real-time updates
-    const pollInterval = setInterval(async () => {
-      try {
-        const response = await apiClient.getSOSAlerts(); // ✅ await the promise
-        if (response.success && response.data && Array.isArray(response.data.alerts)) {
-          setAlerts(response.data.alerts);
-          setFilteredAlerts(response.data.alerts);
+    let stopped = false
+    let eventSource: EventSource | null = null
+    let openTimer: ReturnType<typeof setTimeout> | undefined
+    let lastEventId = ""
+    let reconnects = 0
+
+    const upsertAlerts = (changed: SOSAlert[]) => {
+      setAlerts((prev) => {
+        const ids = new Set(changed.map((alert) => alert.id))
+        const open = changed.filter((alert) => alert.status === "active" || alert.status === "responded")
+        return [...open, ...prev.filter((item) => !ids.has(item.id))]
+      })
+    }
+
+    // Fallback when the server can't stream (e.g. WSGI runserver answers 503)
+    const longPoll = async () => {
+      let lastCheck: string | undefined
+      while (!stopped) {
+        const response = await apiClient.longPollSOSAlerts(lastCheck)
+        if (stopped) return
+        if (response.success && response.data) {
+          lastCheck = response.data.timestamp
+          if (response.data.alerts.length) upsertAlerts(response.data.alerts)
         } else {
-          console.error("Unexpected response structure:", response);
+          await new Promise((resolve) => setTimeout(resolve, 5000))
         }
+      }
+    }
 
-      } catch (error) {
-        console.error("Polling error:", error)
+    const fallBack = () => {
+      clearTimeout(openTimer)
+      eventSource?.close()
+      eventSource = null
+      longPoll()
+    }
+
+    // Stream alert changes over Server-Sent Events, resuming from the last event id
+    const connect = async () => {
+      const url = await apiClient.getSOSEventStreamUrl(lastEventId)
+      if (stopped) return
+      if (!url) return fallBack()
+
+      const source = new EventSource(url)
+      eventSource = source
+      let received = false
+      // The server sends a snapshot or replay right away; silence means it can't stream
+      openTimer = setTimeout(fallBack, 10000)
+
+      const track = (event: Event) => {
+        clearTimeout(openTimer)
+        received = true
+        reconnects = 0
+        lastEventId = (event as MessageEvent).lastEventId || lastEventId
+        return JSON.parse((event as MessageEvent).data)
       }
-    }, 5000) // Poll every 5 seconds
 
-    return () => clearInterval(pollInterval)
+      source.addEventListener("snapshot", (event) => {
+        setAlerts(track(event).alerts || [])
+      })
+      const applyAlert = (event: Event) => upsertAlerts([track(event).alert])
+      source.addEventListener("created", applyAlert)
+      source.addEventListener("responded", applyAlert)
+      source.addEventListener("resolved", (event) => {
+        const { alert } = track(event)
+        setAlerts((prev) => prev.filter((item) => item.id !== alert.id))
+      })
+
+      source.onerror = () => {
+        // Browser retries would reuse the spent ticket, so reconnect with a fresh one instead
+        if (stopped || eventSource !== source) return
+        clearTimeout(openTimer)
+        source.close()
+        if (!received || ++reconnects > 3) return fallBack()
+        setTimeout(connect, 3000)
+      }
+    }
+
+    connect()
+
+    return () => {
+      stopped = true
+      clearTimeout(openTimer)
+      eventSource?.close()
+    }
   }, [toast])
 
   useEffect(() => {
@@ -1,17 +1,111 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from django.conf import settings
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import AuthenticationFailed
-from accounts.models import User  # Your MongoEngine User model
+from accounts.user_cache import user_cache
+
+
+class VerifiedTokenCache:
+    """LRU of tokens whose signature and claims already checked out, kept until they expire."""
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self._tokens = OrderedDict()  # raw token -> validated token
+        self._lock = threading.Lock()
+
+    def get(self, raw_token):
+        with self._lock:
+            validated_token = self._tokens.get(raw_token)
+            if validated_token is None:
+                return None
+            if validated_token.get('exp', 0) <= time.time():
+                del self._tokens[raw_token]
+                return None
+            self._tokens.move_to_end(raw_token)
+            return validated_token
+
+    def put(self, raw_token, validated_token):
+        with self._lock:
+            self._tokens[raw_token] = validated_token
+            self._tokens.move_to_end(raw_token)
+            while len(self._tokens) > self.max_size:
+                self._tokens.popitem(last=False)
+
+
+verified_tokens = VerifiedTokenCache(getattr(settings, 'JWT_VERIFIED_CACHE_SIZE', 4096))
 
 class MongoJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        # Identity map: authenticate once per request, however many times we're asked
+        django_request = getattr(request, '_request', request)
+        if hasattr(django_request, '_jwt_authentication'):
+            return django_request._jwt_authentication
+        result = super().authenticate(request)
+        django_request._jwt_authentication = result
+        return result
+
+    def get_validated_token(self, raw_token):
+        # One HMAC check and claim parse per token, shared with JWTAuthenticationMiddleware
+        if isinstance(raw_token, bytes):
+            raw_token = raw_token.decode()
+        validated_token = verified_tokens.get(raw_token)
+        if validated_token is None:
+            validated_token = super().get_validated_token(raw_token)
+            verified_tokens.put(raw_token, validated_token)
+        return validated_token
+
     def get_user(self, validated_token):
         user_id = validated_token.get("user_id")
 
         if not user_id:
             raise AuthenticationFailed("Token contained no recognizable user identification")
 
-        user = User.objects(id=user_id).first()
+        # Served from the process cache (accounts.user_cache) when fresh
+        user = user_cache.get(user_id)
         if not user:
             raise AuthenticationFailed("User not found")
 
-        return user  # ✅ YOU MISSED THIS LINE EARLIER
+        return user
+
+
+
+def issue_stream_ticket(user):
+    """``(ticket, ttl)`` for ``?ticket=``; unlike a JWT, a used or expired ticket in a log is harmless."""
+    from accounts.models import StreamTicket
+
+    ticket = secrets.token_urlsafe(32)
+    ttl = getattr(settings, 'SSE_TICKET_TTL', 30)
+    StreamTicket(ticket=ticket, user_id=str(user.id), expires_at=datetime.utcnow() + timedelta(seconds=ttl)).save(force_insert=True)
+    return ticket, ttl
+
+
+def redeem_stream_ticket(ticket):
+    from accounts.models import StreamTicket
+
+    # Deleted on first use, so a replayed ticket fails
+    document = StreamTicket._get_collection().find_one_and_delete(
+        {'_id': ticket, 'expires_at': {'$gt': datetime.utcnow()}}
+    )
+    if document is None:
+        raise AuthenticationFailed('Invalid or expired stream ticket')
+    user = user_cache.get(document['user_id'])
+    if not user:
+        raise AuthenticationFailed('User not found')
+    return user
+
+
+def authenticate_request(request, allow_ticket=False):
+    """Authenticate a plain Django request (used by async views outside DRF)."""
+    result = MongoJWTAuthentication().authenticate(request)
+    if result is not None:
+        return result[0]
 
+    ticket = request.GET.get('ticket') if allow_ticket else None
+    if not ticket:
+        return None
+    return redeem_stream_ticket(ticket)
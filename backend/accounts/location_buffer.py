@@ -0,0 +1,171 @@
+"""
+Write-behind buffer for user location pings.
+
+``record`` only touches memory: pings for the same user coalesce into the
+latest position, and a background thread flushes everything pending as one
+unordered bulk of partial ``$set`` updates every ``LOCATION_FLUSH_INTERVAL``
+seconds (or sooner once ``LOCATION_FLUSH_MAX_PENDING`` users are waiting).
+Readers call ``position`` (latest position) and ``history`` (trail points)
+to see pings that have not reached MongoDB yet.
+
+Every ping (not just the latest) is also appended to the user's
+``LocationTrail`` bucket for the current minute, one upsert per user and
+bucket per flush.
+"""
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime
+
+from bson import ObjectId
+from django.conf import settings
+from pymongo import UpdateOne
+
+from safeguard.changes import next_sequence
+from safeguard.versions import bump
+
+from .models import User, LocationTrail
+from .user_cache import user_cache
+
+logger = logging.getLogger(__name__)
+
+
+class LocationBuffer:
+    def __init__(self, flush_interval=2.0, max_pending=500, bucket_seconds=60):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.bucket_seconds = bucket_seconds
+        self._pending = {}  # user_id -> (latitude, longitude, timestamp)
+        self._history = []  # every (user_id, latitude, longitude, timestamp) since the last flush
+        self._flushing = []  # history taken by the running flush, readable until it is written
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher_pid = None
+
+    def record(self, user_id, latitude, longitude, timestamp=None):
+        self._ensure_flusher()
+        timestamp = timestamp or datetime.utcnow()
+        with self._lock:
+            self._pending[str(user_id)] = (latitude, longitude, timestamp)
+            self._history.append((str(user_id), latitude, longitude, timestamp))
+            if len(self._pending) >= self.max_pending:
+                self._wakeup.set()
+
+    def position(self, user_id):
+        """Buffered ``(latitude, longitude, timestamp)`` not yet flushed, else None."""
+        return self._pending.get(str(user_id))
+
+    def history(self, user_id, start, end=None):
+        """Buffered trail points of ``user_id`` from ``start`` to ``end``, in ``points_between`` format.
+
+        A flush that is being written can show up here and in ``LocationTrail``
+        at once, so callers merge by timestamp.
+        """
+        user_id = str(user_id)
+        with self._lock:
+            pings = self._flushing + self._history
+        points = []
+        for ping_user_id, latitude, longitude, timestamp in pings:
+            # Milliseconds, like the stored offsets
+            timestamp = timestamp.replace(microsecond=timestamp.microsecond // 1000 * 1000)
+            if ping_user_id == user_id and timestamp >= start and (end is None or timestamp <= end):
+                points.append({'latitude': latitude, 'longitude': longitude, 'timestamp': timestamp.isoformat()})
+        return points
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            history, self._history = self._history, []
+            self._flushing = history
+        if not pending:
+            return 0
+
+        try:
+            self._flush_history(history)
+        finally:
+            with self._lock:
+                self._flushing = []
+
+        now = datetime.utcnow()
+        change_seq = next_sequence()
+        updates = {
+            user_id: {
+                'current_latitude': latitude,
+                'current_longitude': longitude,
+                'location': {'type': 'Point', 'coordinates': [longitude, latitude]},
+                'last_location_update': timestamp,
+                'updated_at': now,
+                'change_seq': change_seq,
+            }
+            for user_id, (latitude, longitude, timestamp) in pending.items()
+        }
+        operations = [UpdateOne({'_id': ObjectId(user_id)}, {'$set': fields}) for user_id, fields in updates.items()]
+        try:
+            User._get_collection().bulk_write(operations, ordered=False)
+        except Exception:
+            # Put the batch back unless newer pings arrived meanwhile
+            with self._lock:
+                for user_id, ping in pending.items():
+                    self._pending.setdefault(user_id, ping)
+            raise
+        for user_id, fields in updates.items():
+            user_cache.update(user_id, fields)
+        # Only volunteers are drawn on the map, so other users' pings leave its ETag alone
+        ids = [ObjectId(user_id) for user_id in updates]
+        if User._get_collection().count_documents({'_id': {'$in': ids}, 'role': 'volunteer'}, limit=1):
+            bump('volunteer_locations')
+        return len(operations)
+
+    def _flush_history(self, history):
+        buckets = {}
+        for user_id, latitude, longitude, timestamp in history:
+            bucket_start = LocationTrail.bucket_for(timestamp, self.bucket_seconds)
+            offsets, latitudes, longitudes = buckets.setdefault((user_id, bucket_start), ([], [], []))
+            offsets.append(int((timestamp - bucket_start).total_seconds() * 1000))
+            latitudes.append(latitude)
+            longitudes.append(longitude)
+
+        operations = [
+            UpdateOne({'user_id': user_id, 'bucket_start': bucket_start}, {
+                '$push': {
+                    'offsets': {'$each': offsets},
+                    'latitudes': {'$each': latitudes},
+                    'longitudes': {'$each': longitudes},
+                },
+                '$inc': {'count': len(offsets)},
+            }, upsert=True)
+            for (user_id, bucket_start), (offsets, latitudes, longitudes) in buckets.items()
+        ]
+        try:
+            LocationTrail._get_collection().bulk_write(operations, ordered=False)
+        except Exception:
+            # History is best effort; never hold back the position update
+            logger.exception('Location history flush failed')
+
+    def _ensure_flusher(self):
+        # One flusher thread per process, restarted after a fork
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._run, name='location-flusher', daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Location flush failed')
+
+
+location_buffer = LocationBuffer(
+    getattr(settings, 'LOCATION_FLUSH_INTERVAL', 2.0),
+    getattr(settings, 'LOCATION_FLUSH_MAX_PENDING', 500),
+    getattr(settings, 'LOCATION_HISTORY_BUCKET_SECONDS', 60),
+)
+atexit.register(location_buffer.flush)
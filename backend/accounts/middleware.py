@@ -1,24 +1,19 @@
-from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from django.http import JsonResponse
-import jwt
-from django.conf import settings
+from accounts.authentication import MongoJWTAuthentication
 
 class JWTAuthenticationMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        self.authentication = MongoJWTAuthentication()
 
     def __call__(self, request):
         token = self.get_token_from_request(request)
         
         if token:
             try:
-                # Validate token
-                UntypedToken(token)
-                # Decode token to get user info
-                decoded_token = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-                request.user = decoded_token
-            except (InvalidToken, TokenError, jwt.ExpiredSignatureError):
+                # Same verification (and verified-token cache) as the DRF authentication class
+                request.user = self.authentication.get_validated_token(token).payload
+            except (InvalidToken, TokenError):
                 request.user = None
         else:
             request.user = None
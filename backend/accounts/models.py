@@ -1,8 +1,12 @@
-from mongoengine import Document, StringField, EmailField, BooleanField, DateTimeField, ListField, FloatField,IntField
+from mongoengine import Document, StringField, EmailField, BooleanField, DateTimeField, ListField, FloatField,IntField, PointField
 from django.contrib.auth.hashers import make_password, check_password
-from datetime import datetime
+from datetime import datetime, timedelta
+from safeguard.counters import CountedDocument
+from safeguard.versions import VersionedDocument
+from safeguard.changes import TrackedDocument
+from .user_cache import user_cache
 
-class User(Document):
+class User(TrackedDocument, VersionedDocument, CountedDocument, Document):
     ROLE_CHOICES = [
         ('user', 'User'),
         ('volunteer', 'Volunteer'),
@@ -18,11 +22,13 @@ class User(Document):
     is_active = BooleanField(default=True)
     created_at = DateTimeField(default=datetime.utcnow)
     updated_at = DateTimeField(default=datetime.utcnow)
+    change_seq = IntField()  # Delta sync position (safeguard.changes)
     
     # Location fields
     current_latitude = FloatField()
     current_longitude = FloatField()
     last_location_update = DateTimeField()
+    location = PointField()  # GeoJSON mirror of current_latitude/current_longitude (2dsphere indexed)
     
     # Emergency contacts
     emergency_contacts = ListField(StringField(max_length=200))
@@ -33,9 +39,23 @@ class User(Document):
     
     meta = {
         'collection': 'users',
-        'indexes': ['email', 'role', 'is_active']
+        'indexes': ['email', 'role', 'is_active', ('role', 'change_seq'), ('role', 'updated_at')]
     }
     
+    counter_prefixes = ('users',)
+    counter_fields = ('role', 'is_verified', 'is_active')
+    
+    def counter_keys(self):
+        keys = set()
+        if self.is_active:
+            keys.add('users:active')
+        if self.role == 'volunteer':
+            if not self.is_verified:
+                keys.add('users:volunteers_pending')
+            elif self.is_active:
+                keys.add('users:volunteers_verified')
+        return keys
+    
     def set_password(self, raw_password):
         self.password = make_password(raw_password)
     
@@ -44,7 +64,17 @@ class User(Document):
     
     def save(self, *args, **kwargs):
         self.updated_at = datetime.utcnow()
-        return super().save(*args, **kwargs)
+        if self.current_latitude is not None and self.current_longitude is not None:
+            self.location = [self.current_longitude, self.current_latitude]
+        else:
+            self.location = None
+        result = super().save(*args, **kwargs)
+        user_cache.invalidate(self.id)
+        return result
+    
+    def delete(self, *args, **kwargs):
+        user_cache.invalidate(self.id)
+        return super().delete(*args, **kwargs)
     
     def to_dict(self):
         return {
@@ -87,3 +117,55 @@ class VolunteerProfile(Document):
     @property
     def is_authenticated(self):
         return True
+
+
+class StreamTicket(Document):
+    """Short-lived, single-use credential for EventSource, which can't send an Authorization header."""
+    ticket = StringField(primary_key=True)
+    user_id = StringField(required=True)
+    expires_at = DateTimeField(required=True)
+    
+    meta = {
+        'collection': 'stream_tickets',
+        'indexes': [{'fields': ['expires_at'], 'expireAfterSeconds': 0}]
+    }
+
+
+class LocationTrail(Document):
+    """One user's location pings for one time bucket, stored as parallel arrays."""
+    user_id = StringField(required=True)
+    bucket_start = DateTimeField(required=True)
+    offsets = ListField(IntField())  # milliseconds since bucket_start
+    latitudes = ListField(FloatField())
+    longitudes = ListField(FloatField())
+    count = IntField(default=0)
+    
+    meta = {
+        'collection': 'location_trails',
+        'indexes': [
+            {'fields': ['user_id', 'bucket_start'], 'unique': True},
+            {'fields': ['bucket_start'], 'expireAfterSeconds': 30 * 24 * 3600},
+        ]
+    }
+    
+    @staticmethod
+    def bucket_for(timestamp, bucket_seconds=60):
+        epoch_seconds = int((timestamp - datetime(1970, 1, 1)).total_seconds())
+        return datetime(1970, 1, 1) + timedelta(seconds=epoch_seconds - epoch_seconds % bucket_seconds)
+    
+    @classmethod
+    def points_between(cls, user_id, start, end=None, bucket_seconds=60):
+        query = {'user_id': user_id, 'bucket_start__gte': cls.bucket_for(start, bucket_seconds)}
+        if end:
+            query['bucket_start__lte'] = end
+        
+        points = []
+        for bucket in cls.objects(**query).order_by('bucket_start').as_pymongo():
+            for offset, latitude, longitude in zip(bucket['offsets'], bucket['latitudes'], bucket['longitudes']):
+                timestamp = bucket['bucket_start'] + timedelta(milliseconds=offset)
+                if timestamp < start or (end and timestamp > end):
+                    continue
+                points.append({'latitude': latitude, 'longitude': longitude, 'timestamp': timestamp.isoformat()})
+        # Buffered flushes can land slightly out of order within a bucket
+        points.sort(key=lambda point: point['timestamp'])
+        return points
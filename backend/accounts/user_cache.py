@@ -0,0 +1,72 @@
+"""
+Process-wide cache of authenticated users.
+
+Entries are the raw BSON documents, keyed by user id, kept for at most
+``USER_CACHE_TTL`` seconds and evicted least-recently-used beyond
+``USER_CACHE_SIZE``. Every ``get`` builds a fresh ``User`` from the cached
+document, so a view mutating ``request.user`` can't leak into other requests.
+
+``User.save``/``delete`` drop the entry in this process and the location
+buffer patches cached positions after each flush; changes made by other
+workers show up once the entry expires.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+
+
+class UserCache:
+    def __init__(self, max_size=10000, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user_id -> (stored_at, son)
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        from .models import User
+
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(user_id)
+                return User._from_son(entry[1])
+
+        try:
+            son = User._get_collection().find_one({'_id': ObjectId(user_id)})
+        except InvalidId:
+            return None
+        if son is None:
+            return None
+
+        with self._lock:
+            self._entries[user_id] = (time.monotonic(), son)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return User._from_son(son)
+
+    def update(self, user_id, fields):
+        """Patch a cached document after a write that bypassed ``User.save``."""
+        with self._lock:
+            entry = self._entries.get(str(user_id))
+            if entry:
+                entry[1].update(fields)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(
+    getattr(settings, 'USER_CACHE_SIZE', 10000),
+    getattr(settings, 'USER_CACHE_TTL', 30),
+)
@@ -7,6 +7,8 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.hashers import check_password
 from .models import User, VolunteerProfile
+from .location_buffer import location_buffer
+from safety.dispatch import volunteer_locator
 from .serializers import (
     UserRegistrationSerializer, 
     UserLoginSerializer, 
@@ -69,11 +71,7 @@ def login(request):
 @permission_classes([IsAuthenticated])
 def profile(request):
     try:
-        user_id = request.user.id
-        user = User.objects(id=user_id).first()
-        
-        if not user:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        user = request.user
         
         if request.method == 'GET':
             return Response(user.to_dict())
@@ -98,10 +96,10 @@ def profile(request):
 @permission_classes([IsAuthenticated])
 def volunteer_profile(request):
     try:
-        user_id = request.user.id
-        user = User.objects(id=user_id).first()
+        user = request.user
+        user_id = str(user.id)
         
-        if not user or user.role != 'volunteer':
+        if user.role != 'volunteer':
             return Response({'error': 'Volunteer profile not found'}, status=status.HTTP_404_NOT_FOUND)
         
         volunteer_profile = VolunteerProfile.objects(user=user_id).first()
@@ -132,11 +130,9 @@ def volunteer_profile(request):
 @permission_classes([IsAuthenticated])
 def update_location(request):
     try:
-        user_id = request.user.id
-        user = User.objects(id=user_id).first()
-        
-        if not user:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        # Pings are coalesced in memory and flushed as bulk partial updates,
+        # so this path does no MongoDB round trip of its own
+        user = request.user
         
         latitude = request.data.get('latitude')
         longitude = request.data.get('longitude')
@@ -145,7 +141,8 @@ def update_location(request):
             user.current_latitude = float(latitude)
             user.current_longitude = float(longitude)
             user.last_location_update = datetime.utcnow()
-            user.save()
+            location_buffer.record(user.id, user.current_latitude, user.current_longitude, user.last_location_update)
+            volunteer_locator.update(user)
             
             return Response({'message': 'Location updated successfully'})
         
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Full responses versus 304 Not Modified on the cached read endpoints.
+
+Seeds ``--count`` safe zones, risk zones and open SOS alerts into the
+database named by ``--uri`` (it is dropped first, so point it at a scratch
+database). It then requests each endpoint as an admin through the whole
+Django stack: once plain, and once with the ETag from the first response in
+``If-None-Match``. Server time and body bytes are reported for both.
+
+    python benchmarks/conditional_get.py --uri mongodb://localhost:27017/safeguard_benchmark --count 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SOUTH, WEST, NORTH, EAST = 40.49, -74.26, 40.92, -73.70  # New York City
+ENDPOINTS = [
+    '/api/safety/map-data/',
+    '/api/safety/sos-alerts/list/',
+    '/api/safety/stats/',
+]
+
+
+def seed(models, count):
+    now = datetime.utcnow()
+    for model, extra in models:
+        collection = model._get_collection()
+        collection.drop()
+        batch = []
+        for _ in range(count):
+            latitude, longitude = random.uniform(SOUTH, NORTH), random.uniform(WEST, EAST)
+            batch.append(dict(
+                extra, latitude=latitude, longitude=longitude, created_at=now, updated_at=now,
+                location={'type': 'Point', 'coordinates': [longitude, latitude]},
+            ))
+            if len(batch) == 10000:
+                collection.insert_many(batch)
+                batch = []
+        if batch:
+            collection.insert_many(batch)
+        model.ensure_indexes()
+
+
+def measure(client, path, repeat, **headers):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path, **headers)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, response
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--uri', default=os.environ.get('MONGODB_URI', 'mongodb://localhost:27017/safeguard_benchmark'))
+    parser.add_argument('--count', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ['MONGODB_URI'] = args.uri
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'safeguard.settings')
+    import django
+    django.setup()
+
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from accounts.models import User
+    from safety.models import SafeZone, RiskZone, SOSAlert
+
+    seed([
+        (SafeZone, {'name': 'zone', 'zone_type': 'hospital', 'radius': 500, 'is_active': True}),
+        (RiskZone, {'name': 'zone', 'risk_level': 'high', 'radius': 200, 'is_active': True, 'incident_count': 1}),
+        (SOSAlert, {'user_id': 'benchmark', 'user_name': 'Jane Doe', 'status': 'active', 'priority': 'high',
+                    'responders': [], 'nearest_safe_zones': []}),
+    ], args.count)
+
+    User._get_collection().drop()
+    admin = User(email='admin@benchmark.local', name='Admin', role='admin', is_verified=True)
+    admin.set_password('benchmark')
+    admin.save()
+    token = RefreshToken.for_user(admin)
+    token['user_id'] = str(admin.id)
+    token['role'] = admin.role
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    print(f'{"endpoint":<30} {"200 ms":>9} {"200 KB":>9} {"304 ms":>9} {"304 B":>7}')
+    for path in ENDPOINTS:
+        full_ms, full = measure(client, path, args.repeat)
+        cached_ms, cached = measure(client, path, args.repeat, HTTP_IF_NONE_MATCH=full['ETag'])
+        assert cached.status_code == 304, cached.status_code
+        print(f'{path:<30} {full_ms:>9.1f} {len(full.content) / 1024:>9.1f} '
+              f'{cached_ms:>9.2f} {len(cached.content):>7}')
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+map-data cost with and without a viewport, against a real MongoDB.
+
+Seeds ``--count`` safe zones, risk zones and incident reports spread over a
+city into a scratch database, then times query + serialization for the
+whole city versus a few-blocks bbox (the same filters ``get_map_data`` uses).
+
+    python benchmarks/map_viewport.py --uri mongodb://localhost:27017 --count 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongoengine
+
+from safety.geo import Viewport
+
+SOUTH, WEST, NORTH, EAST = 40.49, -74.26, 40.92, -73.70  # New York City
+BLOCKS = '-73.990,40.745,-73.980,40.752'  # a few blocks of Midtown
+
+
+def seed(models, count):
+    now = datetime.utcnow()
+    for model, extra in models:
+        collection = model._get_collection()
+        collection.drop()
+        batch = []
+        for i in range(count):
+            latitude, longitude = random.uniform(SOUTH, NORTH), random.uniform(WEST, EAST)
+            batch.append(dict(
+                extra, latitude=latitude, longitude=longitude, created_at=now, updated_at=now,
+                location={'type': 'Point', 'coordinates': [longitude, latitude]},
+            ))
+            if len(batch) == 10000:
+                collection.insert_many(batch)
+                batch = []
+        if batch:
+            collection.insert_many(batch)
+        model.ensure_indexes()
+
+
+def measure(model, query, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = json.dumps([document.to_dict() for document in model.objects(**query)])
+    return (time.perf_counter() - start) / repeat * 1000, len(body)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--uri', default=os.environ.get('MONGODB_URI', 'mongodb://localhost:27017'))
+    parser.add_argument('--db', default='safeguard_benchmark')
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    mongoengine.connect(args.db, host=args.uri)
+    from safety.models import SafeZone, RiskZone, IncidentReport
+
+    models = [
+        (SafeZone, {'name': 'zone', 'zone_type': 'hospital', 'radius': 500, 'is_active': True}),
+        (RiskZone, {'name': 'zone', 'risk_level': 'high', 'radius': 200, 'is_active': True, 'incident_count': 1}),
+        (IncidentReport, {'incident_type': 'other', 'severity': 'low', 'description': 'x',
+                          'incident_time': datetime.utcnow(), 'status': 'pending'}),
+    ]
+    seed(models, args.count)
+
+    viewport = Viewport.from_params({'bbox': BLOCKS})
+    print(f'{"layer":<18} {"full ms":>9} {"full KB":>9} {"bbox ms":>9} {"bbox KB":>9}')
+    for model, _ in models:
+        full_ms, full_bytes = measure(model, {}, args.repeat)
+        bbox_ms, bbox_bytes = measure(model, viewport.query(), args.repeat)
+        print(f'{model._meta["collection"]:<18} {full_ms:>9.1f} {full_bytes / 1024:>9.0f} '
+              f'{bbox_ms:>9.2f} {bbox_bytes / 1024:>9.1f}')
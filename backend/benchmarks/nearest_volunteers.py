@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+k-nearest volunteer lookup latency for the in-memory grid index.
+
+Scatters volunteers uniformly over a city-sized box and times
+``GridIndex.nearest`` against a brute-force haversine scan.
+
+    python benchmarks/nearest_volunteers.py --volunteers 10000 50000 --k 5 --radius 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from safety.geo import GridIndex, haversine
+
+SOUTH, WEST, NORTH, EAST = 40.49, -74.26, 40.92, -73.70  # New York City
+
+
+def random_point():
+    return random.uniform(SOUTH, NORTH), random.uniform(WEST, EAST)
+
+
+def run(volunteers, k, radius, queries):
+    index = GridIndex()
+    points = []
+    for i in range(volunteers):
+        latitude, longitude = random_point()
+        index.insert(str(i), latitude, longitude)
+        points.append((latitude, longitude))
+    probes = [random_point() for _ in range(queries)]
+
+    start = time.perf_counter()
+    for latitude, longitude in probes:
+        index.nearest(latitude, longitude, k, radius)
+    grid_us = (time.perf_counter() - start) / queries * 1e6
+
+    start = time.perf_counter()
+    for latitude, longitude in probes[:20]:
+        sorted(haversine(latitude, longitude, *point) for point in points)[:k]
+    scan_us = (time.perf_counter() - start) / 20 * 1e6
+
+    print(f'{volunteers:>10} {grid_us:>10.1f} {scan_us:>12.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--volunteers', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--radius', type=float, default=5000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f'{"volunteers":>10} {"grid us":>10} {"scan us":>12}')
+    for count in args.volunteers:
+        run(count, args.k, args.radius, args.queries)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Per-record serialization cost of the map-data and SOS list read paths.
+
+Builds raw documents shaped like the ``sos_alerts``, ``safe_zones`` and
+``risk_zones`` collections (no database needed) and times both paths:
+
+* before: ``Document._from_son`` + ``to_dict()`` + DRF's ``JSONRenderer``
+* after: compiled ``safety.serializers`` on the raw dict + ``ORJSONRenderer``
+
+Only CPU cost is measured. The smaller projected documents also save wire
+and decode time, and that saving is not included here.
+
+    python benchmarks/serialization.py --records 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django
+from django.conf import settings
+
+settings.configure(INSTALLED_APPS=['rest_framework'])
+django.setup()
+
+from bson import ObjectId
+from rest_framework.renderers import JSONRenderer
+
+from safeguard.renderers import ORJSONRenderer
+from safety import serializers
+from safety.models import SOSAlert, SafeZone, RiskZone
+
+
+def point():
+    return random.uniform(40.49, 40.92), random.uniform(-74.26, -73.70)
+
+
+def timestamp():
+    return datetime(2026, 1, 1) + timedelta(milliseconds=random.randrange(10 ** 10))
+
+
+def sos_alert():
+    latitude, longitude = point()
+    return {
+        '_id': ObjectId(), 'user_id': str(ObjectId()), 'user_name': 'Jane Doe',
+        'latitude': latitude, 'longitude': longitude,
+        'location': {'type': 'Point', 'coordinates': [longitude, latitude]},
+        'address': '5th Ave', 'status': 'active', 'priority': 'high', 'message': 'Help',
+        'responders': [str(ObjectId()) for _ in range(random.randrange(3))],
+        'nearest_safe_zones': [], 'created_at': timestamp(), 'updated_at': timestamp(),
+    }
+
+
+def safe_zone():
+    latitude, longitude = point()
+    return {
+        '_id': ObjectId(), 'name': 'City Hospital', 'latitude': latitude, 'longitude': longitude,
+        'location': {'type': 'Point', 'coordinates': [longitude, latitude]},
+        'radius': 500.0, 'zone_type': 'hospital', 'description': 'Open 24h', 'is_active': True,
+        'created_at': timestamp(), 'updated_at': timestamp(),
+    }
+
+
+def risk_zone():
+    latitude, longitude = point()
+    return {
+        '_id': ObjectId(), 'name': 'Hotspot', 'latitude': latitude, 'longitude': longitude,
+        'location': {'type': 'Point', 'coordinates': [longitude, latitude]},
+        'radius': 200.0, 'risk_level': 'high', 'description': 'Derived', 'incident_count': 4,
+        'is_active': True, 'created_at': timestamp(), 'updated_at': timestamp(),
+    }
+
+
+def per_record_us(function, documents, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(documents)
+        best = min(best, time.perf_counter() - start)
+    return best / len(documents) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    drf, fast = JSONRenderer(), ORJSONRenderer()
+    cases = [
+        ('sos_alerts', SOSAlert, sos_alert, serializers.sos_alert),
+        ('safe_zones', SafeZone, safe_zone, serializers.safe_zone),
+        ('risk_zones', RiskZone, risk_zone, serializers.risk_zone),
+    ]
+
+    print(f'{"layer":<12} {"before us":>10} {"after us":>10} {"speedup":>8}')
+    for name, model, factory, serializer in cases:
+        documents = [factory() for _ in range(args.records)]
+        projected = [{key: document[key] for key in ['_id'] + serializer.fields if key in document}
+                     for document in documents]
+
+        before = per_record_us(
+            lambda batch: drf.render({name: [model._from_son(son).to_dict() for son in batch]}),
+            documents, args.repeat)
+        after = per_record_us(
+            lambda batch: fast.render({name: serializer.many(batch)}),
+            projected, args.repeat)
+        print(f'{name:<12} {before:>10.2f} {after:>10.2f} {before / after:>7.1f}x')
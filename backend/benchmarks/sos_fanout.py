@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+SOS fan-out latency versus worker count for the local-socket backplane.
+
+Each worker process subscribes to the backplane the same way a gunicorn
+worker's notification hub does; one publisher then sends timestamped
+events and every worker reports how long each one took to arrive.
+
+    python benchmarks/sos_fanout.py --workers 1 2 4 8 16 --events 200
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from safety.backplane import LocalSocketBackplane
+
+
+def worker(path, expected, ready, results):
+    latencies = []
+    done = multiprocessing.Event()
+
+    def deliver(event, payload):
+        latencies.append(time.time() - payload['sent_at'])
+        if len(latencies) == expected:
+            done.set()
+
+    backplane = LocalSocketBackplane(path=path)
+    backplane.start(deliver)
+    ready.put(os.getpid())
+    done.wait(timeout=30)
+    backplane.close()
+    results.put(latencies)
+
+
+def run(workers, events):
+    path = tempfile.mkdtemp(prefix='sos-fanout-')
+    ready, results = multiprocessing.Queue(), multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(path, events, ready, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get()
+
+    publisher = LocalSocketBackplane(path=path)
+    publisher.start(lambda event, payload: None)
+    for i in range(events):
+        publisher.publish('created', {'id': str(i), 'sent_at': time.time()})
+        time.sleep(0.001)
+    publisher.close()
+
+    latencies = []
+    for _ in processes:
+        latencies.extend(results.get())
+    for process in processes:
+        process.join()
+
+    latencies.sort()
+    lost = workers * events - len(latencies)
+    if not latencies:
+        print(f'{workers:>7} {"-":>9} {"-":>9} {lost:>6}')
+        return
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f'{workers:>7} {p50:>9.3f} {p99:>9.3f} {lost:>6}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--events', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f'{"workers":>7} {"p50 ms":>9} {"p99 ms":>9} {"lost":>6}')
+    for count in args.workers:
+        run(count, args.events)
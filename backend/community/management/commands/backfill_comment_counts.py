@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from community.models import CommunityPost, Comment
+from safeguard.versions import bump
+
+
+class Command(BaseCommand):
+    help = 'Recompute CommunityPost.comments_count from the active comments'
+
+    def handle(self, *args, **options):
+        counts = {
+            row['_id']: row['count']
+            for row in Comment._get_collection().aggregate([
+                {'$match': {'is_active': True}},
+                {'$group': {'_id': '$post_id', 'count': {'$sum': 1}}},
+            ])
+        }
+
+        operations = [
+            UpdateOne({'_id': post['_id']}, {'$set': {'comments_count': counts.get(str(post['_id']), 0)}})
+            for post in CommunityPost._get_collection().find({}, {'comments_count': 1})
+            if post.get('comments_count') != counts.get(str(post['_id']), 0)
+        ]
+        if operations:
+            CommunityPost._get_collection().bulk_write(operations, ordered=False)
+            bump('community_posts')
+        self.stdout.write(f'{len(operations)} posts updated')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from community.models import CommunityPost
+from safeguard.versions import bump
+
+
+class Command(BaseCommand):
+    help = 'Set is_pinned=False on posts stored without it, so feed cursors (is_pinned < false) reach them'
+
+    def handle(self, *args, **options):
+        result = CommunityPost._get_collection().update_many({'is_pinned': None}, {'$set': {'is_pinned': False}})
+        if result.modified_count:
+            bump('community_posts')
+        self.stdout.write(f'{result.modified_count} posts updated')
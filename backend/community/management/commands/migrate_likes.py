@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from community.models import Like
+from safeguard.versions import bump
+
+
+class Command(BaseCommand):
+    help = 'Move embedded likes arrays into the Like collection and recompute likes_count'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        likes = Like._get_collection()
+        for target_type, model in Like.TARGETS.items():
+            collection = model._get_collection()
+
+            # Copy edges first; duplicates from earlier runs or new-style likes are skipped
+            edges = []
+            for document in collection.find({'likes.0': {'$exists': True}}, {'likes': 1}):
+                edges += [
+                    InsertOne({'target_type': target_type, 'target_id': str(document['_id']), 'user_id': user_id})
+                    for user_id in set(document['likes'])
+                ]
+                if len(edges) >= options['batch_size']:
+                    self._insert(likes, edges)
+                    edges = []
+            self._insert(likes, edges)
+
+            # Then recount from the edges and drop the arrays
+            counts = {
+                row['_id']: row['count']
+                for row in likes.aggregate([
+                    {'$match': {'target_type': target_type}},
+                    {'$group': {'_id': '$target_id', 'count': {'$sum': 1}}},
+                ])
+            }
+            operations = [
+                UpdateOne({'_id': document['_id']}, {
+                    '$set': {'likes_count': counts.get(str(document['_id']), 0)},
+                    '$unset': {'likes': ''},
+                })
+                for document in collection.find({}, {'_id': 1})
+            ]
+            for start in range(0, len(operations), options['batch_size']):
+                collection.bulk_write(operations[start:start + options['batch_size']], ordered=False)
+            bump(model._meta['collection'])
+            self.stdout.write(f'{model._meta["collection"]}: {len(operations)} documents recounted')
+
+    def _insert(self, collection, edges):
+        if not edges:
+            return
+        try:
+            collection.bulk_write(edges, ordered=False)
+        except BulkWriteError as e:
+            if any(error['code'] != 11000 for error in e.details['writeErrors']):
+                raise
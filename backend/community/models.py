@@ -1,7 +1,11 @@
-from mongoengine import Document, StringField, DateTimeField, BooleanField, IntField, ListField
+from mongoengine import Document, StringField, DateTimeField, BooleanField, IntField, ListField, NotUniqueError
 from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+from safeguard.counters import CountedDocument, day_key
+from safeguard.versions import VersionedDocument, bump
 
-class CommunityPost(Document):
+class CommunityPost(VersionedDocument, CountedDocument, Document):
     CATEGORY_CHOICES = [
         ('safety_tip', 'Safety Tip'),
         ('question', 'Question'),
@@ -16,7 +20,9 @@ class CommunityPost(Document):
     title = StringField(max_length=200)
     content = StringField(required=True)
     category = StringField(choices=CATEGORY_CHOICES, default='discussion')
-    likes = ListField(StringField())  # List of user IDs who liked
+    likes = ListField(StringField())  # Legacy: likes live in the Like collection (see migrate_likes)
+    likes_count = IntField(default=0)  # Kept in step by Like.toggle
+    comments_count = IntField(default=0)  # Active comments, kept in step by Comment
     is_pinned = BooleanField(default=False)
     is_active = BooleanField(default=True)
     created_at = DateTimeField(default=datetime.utcnow)
@@ -24,9 +30,22 @@ class CommunityPost(Document):
     
     meta = {
         'collection': 'community_posts',
-        'indexes': ['user_id', 'category', 'is_pinned', 'created_at']
+        'indexes': [
+            'user_id', 'category', 'is_pinned', 'created_at',
+            # Feed order, for keyset pagination (safeguard.pagination)
+            ('is_active', '-is_pinned', '-created_at', '-id'),
+            ('is_active', 'category', '-is_pinned', '-created_at', '-id'),
+        ]
     }
     
+    counter_prefixes = ('community_posts',)
+    counter_fields = ('is_active', 'created_at')
+    
+    def counter_keys(self):
+        if not self.is_active:
+            return set()
+        return {'community_posts:active', day_key('community_posts', self.created_at)}
+    
     def save(self, *args, **kwargs):
         self.updated_at = datetime.utcnow()
         return super().save(*args, **kwargs)
@@ -40,33 +59,47 @@ class CommunityPost(Document):
             'title': self.title,
             'content': self.content,
             'category': self.category,
-            'likes_count': len(self.likes),
+            'likes_count': self.likes_count,
             'is_liked': False,  # Will be set in view based on current user
+            'comments_count': self.comments_count,
             'is_pinned': self.is_pinned,
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
 
-class Comment(Document):
+class Comment(VersionedDocument, Document):
     post_id = StringField(required=True)
     user_id = StringField(required=True)
     user_name = StringField(required=True)
     user_role = StringField(required=True)
     content = StringField(required=True)
-    likes = ListField(StringField())  # List of user IDs who liked
+    likes = ListField(StringField())  # Legacy: likes live in the Like collection (see migrate_likes)
+    likes_count = IntField(default=0)  # Kept in step by Like.toggle
     is_active = BooleanField(default=True)
     created_at = DateTimeField(default=datetime.utcnow)
     updated_at = DateTimeField(default=datetime.utcnow)
     
     meta = {
         'collection': 'comments',
-        'indexes': ['post_id', 'user_id', 'created_at']
+        'indexes': [
+            'post_id', 'user_id', 'created_at',
+            ('post_id', 'is_active', '-created_at', '-id'),
+        ]
     }
     
     def save(self, *args, **kwargs):
         self.updated_at = datetime.utcnow()
-        return super().save(*args, **kwargs)
+        created = self.pk is None
+        toggled = False
+        if not created and 'is_active' in self._get_changed_fields():
+            # Conditional update first, so concurrent saves move the post's count exactly once
+            toggled = Comment.objects(id=self.id, is_active__ne=self.is_active).update_one(set__is_active=self.is_active)
+        result = super().save(*args, **kwargs)
+        if (created and self.is_active) or toggled:
+            CommunityPost.objects(id=self.post_id).update_one(inc__comments_count=1 if self.is_active else -1)
+            bump('community_posts')
+        return result
     
     def to_dict(self):
         return {
@@ -76,14 +109,60 @@ class Comment(Document):
             'user_name': self.user_name,
             'user_role': self.user_role,
             'content': self.content,
-            'likes_count': len(self.likes),
+            'likes_count': self.likes_count,
             'is_liked': False,  # Will be set in view based on current user
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
 
-class Announcement(Document):
+class Like(Document):
+    """One user liking one post or comment; the unique index makes toggles race-free."""
+    target_type = StringField(choices=[('post', 'Post'), ('comment', 'Comment')], required=True)
+    target_id = StringField(required=True)
+    user_id = StringField(required=True)
+    created_at = DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'likes',
+        'indexes': [
+            {'fields': ['target_type', 'target_id', 'user_id'], 'unique': True},
+            ('user_id', 'target_type', 'target_id'),
+        ]
+    }
+    
+    TARGETS = {'post': CommunityPost, 'comment': Comment}
+    
+    @classmethod
+    def toggle(cls, target_type, target_id, user_id):
+        """Like, or unlike if already liked; returns ``(liked, likes_count)``."""
+        target_id = str(target_id)
+        try:
+            cls(target_type=target_type, target_id=target_id, user_id=user_id).save(force_insert=True)
+            liked, step = True, 1
+        except NotUniqueError:
+            deleted = cls.objects(target_type=target_type, target_id=target_id, user_id=user_id).delete()
+            liked, step = False, -1 if deleted else 0
+        
+        target = cls.TARGETS[target_type]._get_collection().find_one_and_update(
+            {'_id': ObjectId(target_id)},
+            {'$inc': {'likes_count': step}},
+            projection={'likes_count': 1},
+            return_document=ReturnDocument.AFTER
+        )
+        bump(cls.TARGETS[target_type]._meta['collection'])
+        return liked, target['likes_count'] if target else 0
+    
+    @classmethod
+    def liked_ids(cls, target_type, user_id, target_ids):
+        """The subset of ``target_ids`` the user has liked, in one query."""
+        return set(cls.objects(
+            target_type=target_type,
+            user_id=user_id,
+            target_id__in=[str(target_id) for target_id in target_ids]
+        ).scalar('target_id'))
+
+class Announcement(VersionedDocument, Document):
     title = StringField(required=True, max_length=200)
     content = StringField(required=True)
     author_id = StringField(required=True)
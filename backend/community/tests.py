@@ -0,0 +1,46 @@
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+from accounts.user_cache import user_cache
+from community.models import CommunityPost, Like
+from safeguard.versions import versions
+
+
+def authenticated_client(user):
+    token = RefreshToken.for_user(user)
+    token['user_id'] = str(user.id)
+    token['role'] = user.role
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+    return client
+
+
+def test_community_posts_query_count_does_not_grow_with_page_size(mongo):
+    user = User(email='reader@example.com', name='Reader', role='user', is_verified=True)
+    user.set_password('secret')
+    user.save()
+    client = authenticated_client(user)
+
+    commands = {}
+    for count in (1, 20):
+        CommunityPost.objects.delete()
+        Like.objects.delete()
+        posts = [
+            CommunityPost(user_id=str(user.id), user_name=user.name, user_role=user.role, content=f'Post {i}').save()
+            for i in range(count)
+        ]
+        for post in posts[::2]:
+            Like.toggle('post', str(post.id), str(user.id))
+
+        # Start from cold caches so both requests do the same lookups
+        user_cache.clear()
+        versions._versions.clear()
+        mongo.commands.clear()
+        response = client.get('/api/community/posts/', {'limit': 20})
+
+        assert response.status_code == 200
+        assert len(response.json()['posts']) == count
+        commands[count] = list(mongo.commands)
+
+    assert commands[1] == commands[20]
@@ -2,12 +2,21 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from datetime import datetime, timedelta
-from .models import CommunityPost, Comment, Announcement
+from datetime import datetime
+from .models import CommunityPost, Comment, Announcement, Like
 from accounts.models import User
+from safeguard import counters
+from django.conf import settings
+from safeguard.pagination import paginate
+from safeguard.versions import conditional
+
+POST_ORDER = ['-is_pinned', '-created_at', '-id']
+COMMENT_ORDER = ['-created_at', '-id']
+PAGE_MAX_LIMIT = 100
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@conditional('community_posts')
 def community_posts(request):
     try:
         user = request.user  # ✅ this is the correct way
@@ -18,34 +27,44 @@ def community_posts(request):
         
         if request.method == 'GET':
             category = request.GET.get('category')
-            page = int(request.GET.get('page', 1))
-            limit = int(request.GET.get('limit', 20))
-            skip = (page - 1) * limit
+            limit = max(1, min(int(request.GET.get('limit', 20)), PAGE_MAX_LIMIT))
             
             # Build query
             query = {'is_active': True}
             if category:
                 query['category'] = category
+            posts = CommunityPost.objects(**query).exclude('likes')
             
-            # Get posts
-            posts = CommunityPost.objects(**query).order_by('-is_pinned', '-created_at').skip(skip).limit(limit)
+            # Get posts: keyset pagination with ?cursor=, ?page= kept for old clients
+            page = request.GET.get('page')
+            if page:
+                page = max(1, int(page))
+                posts = list(posts.order_by(*POST_ORDER).skip((page - 1) * limit).limit(limit))
+                next_cursor = None
+                has_more = len(posts) == limit
+            else:
+                try:
+                    posts, next_cursor = paginate(posts, POST_ORDER, limit, request.GET.get('cursor'))
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                has_more = next_cursor is not None
             
+            liked = Like.liked_ids('post', user_id, [post.id for post in posts])
             posts_data = []
             for post in posts:
                 post_dict = post.to_dict()
-                post_dict['is_liked'] = user_id in post.likes
-                
-                # Get comments count
-                comments_count = Comment.objects(post_id=str(post.id), is_active=True).count()
-                post_dict['comments_count'] = comments_count
-                
+                post_dict['is_liked'] = str(post.id) in liked
                 posts_data.append(post_dict)
             
-            return Response({
+            data = {
                 'posts': posts_data,
-                'page': page,
-                'has_more': len(posts_data) == limit
-            })
+                'next_cursor': next_cursor,
+                'has_more': has_more
+            }
+            # Page numbers are unknown past the first cursor page
+            if page or not request.GET.get('cursor'):
+                data['page'] = page or 1
+            return Response(data)
         
         elif request.method == 'POST':
             content = request.data.get('content')
@@ -81,24 +100,14 @@ def like_post(request, post_id):
         user_id = str(request.user.id)  # ✅ or: user = request.user
 
         
-        post = CommunityPost.objects(id=post_id, is_active=True).first()
-        if not post:
+        if not CommunityPost.objects(id=post_id, is_active=True).only('id').first():
             return Response({'error': 'Post not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        if user_id in post.likes:
-            # Unlike
-            post.likes.remove(user_id)
-            liked = False
-        else:
-            # Like
-            post.likes.append(user_id)
-            liked = True
-        
-        post.save()
+        liked, likes_count = Like.toggle('post', post_id, user_id)
         
         return Response({
             'liked': liked,
-            'likes_count': len(post.likes)
+            'likes_count': likes_count
         })
     
     except Exception as e:
@@ -106,6 +115,7 @@ def like_post(request, post_id):
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@conditional('comments')
 def post_comments(request, post_id):
     try:
         user = request.user  # ✅ this is the correct way
@@ -115,31 +125,43 @@ def post_comments(request, post_id):
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
         
         # Verify post exists
-        post = CommunityPost.objects(id=post_id, is_active=True).first()
+        post = CommunityPost.objects(id=post_id, is_active=True).only('id').first()
         if not post:
             return Response({'error': 'Post not found'}, status=status.HTTP_404_NOT_FOUND)
         
         if request.method == 'GET':
-            page = int(request.GET.get('page', 1))
-            limit = int(request.GET.get('limit', 20))
-            skip = (page - 1) * limit
+            limit = max(1, min(int(request.GET.get('limit', 20)), PAGE_MAX_LIMIT))
+            comments = Comment.objects(post_id=post_id, is_active=True).exclude('likes')
             
-            comments = Comment.objects(
-                post_id=post_id, 
-                is_active=True
-            ).order_by('-created_at').skip(skip).limit(limit)
+            page = request.GET.get('page')
+            if page:
+                page = max(1, int(page))
+                comments = list(comments.order_by(*COMMENT_ORDER).skip((page - 1) * limit).limit(limit))
+                next_cursor = None
+                has_more = len(comments) == limit
+            else:
+                try:
+                    comments, next_cursor = paginate(comments, COMMENT_ORDER, limit, request.GET.get('cursor'))
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                has_more = next_cursor is not None
             
+            liked = Like.liked_ids('comment', user_id, [comment.id for comment in comments])
             comments_data = []
             for comment in comments:
                 comment_dict = comment.to_dict()
-                comment_dict['is_liked'] = user_id in comment.likes
+                comment_dict['is_liked'] = str(comment.id) in liked
                 comments_data.append(comment_dict)
             
-            return Response({
+            data = {
                 'comments': comments_data,
-                'page': page,
-                'has_more': len(comments_data) == limit
-            })
+                'next_cursor': next_cursor,
+                'has_more': has_more
+            }
+            # Page numbers are unknown past the first cursor page
+            if page or not request.GET.get('cursor'):
+                data['page'] = page or 1
+            return Response(data)
         
         elif request.method == 'POST':
             content = request.data.get('content')
@@ -166,6 +188,7 @@ def post_comments(request, post_id):
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@conditional('announcements', refresh=getattr(settings, 'ANNOUNCEMENT_ETAG_REFRESH', 60))
 def announcements(request):
     try:
         user = request.user  # ✅ this is the correct way
@@ -227,6 +250,8 @@ def announcements(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+# Hourly rollover keeps the posts_this_week window moving
+@conditional('users', 'community_posts', refresh=3600)
 def community_stats(request):
     try:
         user = request.user  # ✅ this is the correct way
@@ -235,14 +260,14 @@ def community_stats(request):
         if not user:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
         
+        # Materialized counters (safeguard.counters); the week is summed from daily buckets
+        week = counters.recent_day_keys('community_posts', days=7)
+        values = counters.read(['users:active', 'community_posts:active', 'users:volunteers_verified'] + week)
         stats = {
-            'total_members': User.objects(is_active=True).count(),
-            'total_posts': CommunityPost.objects(is_active=True).count(),
-            'posts_this_week': CommunityPost.objects(
-                is_active=True,
-                created_at__gte=datetime.utcnow() - timedelta(days=7)
-            ).count(),
-            'active_volunteers': User.objects(role='volunteer', is_verified=True, is_active=True).count(),
+            'total_members': values['users:active'],
+            'total_posts': values['community_posts:active'],
+            'posts_this_week': sum(values[name] for name in week),
+            'active_volunteers': values['users:volunteers_verified'],
         }
         
         return Response(stats)
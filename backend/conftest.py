@@ -0,0 +1,62 @@
+"""
+pytest setup: Django settings, with MongoDB pointed at ``MONGODB_TEST_URI``.
+
+Tests that need MongoDB use the ``mongo`` fixture. It connects with a
+command listener and skips the test when no server answers.
+"""
+import os
+
+TEST_URI = os.environ.get('MONGODB_TEST_URI', 'mongodb://localhost:27017/safeguard_test')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'safeguard.settings')
+os.environ['MONGODB_URI'] = TEST_URI
+
+import django  # noqa: E402
+
+django.setup()
+
+import mongoengine  # noqa: E402
+import pytest  # noqa: E402
+from pymongo import monitoring  # noqa: E402
+from pymongo.errors import ServerSelectionTimeoutError  # noqa: E402
+
+
+class CommandLog(monitoring.CommandListener):
+    """Names of the database commands sent, leaving out connection handshakes."""
+    ignored = {'hello', 'ismaster', 'isMaster', 'ping', 'endSessions', 'saslStart', 'saslContinue'}
+
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        if event.command_name not in self.ignored:
+            self.commands.append(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+@pytest.fixture
+def mongo():
+    from accounts.user_cache import user_cache
+    from safeguard.versions import versions
+
+    log = CommandLog()
+    mongoengine.disconnect()
+    client = mongoengine.connect(host=TEST_URI, event_listeners=[log], serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command('ping')
+    except ServerSelectionTimeoutError:
+        mongoengine.disconnect()
+        pytest.skip(f'no MongoDB server at {TEST_URI}')
+
+    database = mongoengine.connection.get_db()
+    client.drop_database(database.name)
+    user_cache.clear()
+    versions._versions.clear()
+    yield log
+    client.drop_database(database.name)
+    mongoengine.disconnect()
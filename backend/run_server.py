@@ -89,5 +89,10 @@ if __name__ == '__main__':
     print("Sample data setup complete!")
     print("\nStarting Django development server...")
     
-    # Start the development server
-    execute_from_command_line(['manage.py', 'runserver', '0.0.0.0:8000'])
+    # Start the development server. runserver is WSGI, where the SOS monitor
+    # falls back to long-polling; --asgi serves the event stream as well.
+    if '--asgi' in sys.argv:
+        import uvicorn
+        uvicorn.run('safeguard.asgi:application', host='0.0.0.0', port=8000)
+    else:
+        execute_from_command_line(['manage.py', 'runserver', '0.0.0.0:8000'])
@@ -0,0 +1,113 @@
+"""
+Change sequence and tombstones for delta sync (``get_map_data?since=``).
+
+Every write to a ``TrackedDocument`` stamps it with ``change_seq``, taken
+from one global counter. Raw bulk writers reserve values with
+``next_sequence`` themselves. A hard delete leaves a ``Tombstone`` behind,
+and tombstones expire after ``SYNC_TOMBSTONE_DAYS``.
+
+A sync cursor is ``<sequence>.<milliseconds>``: the counter value and the
+clock at the start of the request that issued it. A sequence number is
+taken before its write commits, so a slow write can land after a reader
+has moved past its number. ``changed_since`` therefore also matches
+anything whose ``updated_at`` is within ``SYNC_GRACE_SECONDS`` of the
+cursor's time. Clients may receive the same item twice and must apply
+changes as upserts by id.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from mongoengine import Document, StringField, IntField, DateTimeField
+from pymongo import ReturnDocument
+
+SEQUENCE = 'changes'
+
+
+class Sequence(Document):
+    name = StringField(primary_key=True)
+    value = IntField(default=0)
+
+    meta = {'collection': 'sequences'}
+
+
+class Tombstone(Document):
+    """A hard-deleted document, kept so delta clients learn it is gone."""
+    collection = StringField(required=True)
+    object_id = StringField(required=True)
+    change_seq = IntField(required=True)
+    deleted_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'collection': 'tombstones',
+        'indexes': [
+            ('collection', 'change_seq'),
+            ('collection', 'deleted_at'),
+            {'fields': ['deleted_at'], 'expireAfterSeconds': getattr(settings, 'SYNC_TOMBSTONE_DAYS', 7) * 86400},
+        ]
+    }
+
+
+class CursorExpired(ValueError):
+    pass
+
+
+def next_sequence(count=1):
+    """Reserve ``count`` sequence values and return the last one."""
+    document = Sequence._get_collection().find_one_and_update(
+        {'_id': SEQUENCE}, {'$inc': {'value': count}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return document['value']
+
+
+def current_sequence():
+    document = Sequence._get_collection().find_one({'_id': SEQUENCE})
+    return document['value'] if document else 0
+
+
+def new_cursor():
+    return encode_cursor(current_sequence(), datetime.utcnow())
+
+
+def encode_cursor(sequence, moment):
+    return f'{sequence}.{int((moment - datetime(1970, 1, 1)).total_seconds() * 1000)}'
+
+
+def decode_cursor(value):
+    """``(sequence, moment)`` from a cursor; raises ValueError if it is malformed or expired."""
+    try:
+        sequence, millis = (int(part) for part in value.split('.'))
+        moment = datetime(1970, 1, 1) + timedelta(milliseconds=millis)
+    except (ValueError, OverflowError):
+        raise ValueError('Invalid since cursor')
+    if moment < datetime.utcnow() - timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_DAYS', 7)):
+        raise CursorExpired('since cursor is older than the tombstone retention, reload without it')
+    return sequence, moment
+
+
+def changed_since(cursor, time_field='updated_at'):
+    """Raw query matching documents written after ``cursor`` (a decoded pair)."""
+    sequence, moment = cursor
+    grace = timedelta(seconds=getattr(settings, 'SYNC_GRACE_SECONDS', 5))
+    return {'$or': [{'change_seq': {'$gt': sequence}}, {time_field: {'$gte': moment - grace}}]}
+
+
+def deleted_since(collection, cursor):
+    """Ids of documents in ``collection`` hard-deleted after ``cursor``."""
+    return list(Tombstone.objects(
+        collection=collection, __raw__=changed_since(cursor, 'deleted_at')
+    ).scalar('object_id'))
+
+
+class TrackedDocument:
+    """Mixin for documents that take part in delta sync; they declare ``change_seq``."""
+
+    def save(self, *args, **kwargs):
+        self.change_seq = next_sequence()
+        return super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        Tombstone(
+            collection=self._meta['collection'], object_id=str(self.id), change_seq=next_sequence()
+        ).save()
+        return result
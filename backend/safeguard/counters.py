@@ -0,0 +1,156 @@
+"""
+Materialized counters for dashboard stats.
+
+Each counter is a tiny ``{_id: name, value}`` document in the ``counters``
+collection. Documents that feed a counter mix in ``CountedDocument`` and
+list the counter names they currently belong to in ``counter_keys()``; on
+``save``/``delete`` the difference between the keys a document had when it
+was loaded and the keys it has now becomes one bulk of ``$inc`` upserts.
+Stats endpoints then fetch all the counters they need with a single ``$in``
+read, whatever the size of the underlying collections.
+
+Writes that bypass ``Document.save`` (raw bulk updates) aren't counted, and
+concurrent saves of the same document can double count, so
+``manage.py reconcile_counters`` recomputes every counter from the source
+collections and should run periodically.
+"""
+import abc
+import logging
+from collections import Counter as Tally
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from mongoengine import Document, StringField, IntField, DateTimeField
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+
+class Counter(Document):
+    name = StringField(primary_key=True)
+    value = IntField(default=0)
+    updated_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {'collection': 'counters'}
+
+
+def day_key(prefix, moment):
+    return f'{prefix}:day:{moment.strftime("%Y-%m-%d")}'
+
+
+def recent_day_keys(prefix, days=7, now=None):
+    """Daily bucket names covering the last ``days`` days, today included."""
+    now = now or datetime.utcnow()
+    return [day_key(prefix, now - timedelta(days=offset)) for offset in range(days)]
+
+
+def increment(deltas):
+    """Apply ``{name: amount}`` as one unordered bulk of ``$inc`` upserts."""
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne({'_id': name}, {'$inc': {'value': amount}, '$set': {'updated_at': now}}, upsert=True)
+        for name, amount in deltas.items() if amount
+    ]
+    if operations:
+        Counter._get_collection().bulk_write(operations, ordered=False)
+
+
+def read(names):
+    """``{name: value}`` for every requested counter (0 if it doesn't exist yet)."""
+    values = dict.fromkeys(names, 0)
+    for counter in Counter._get_collection().find({'_id': {'$in': list(values)}}, {'value': 1}):
+        values[counter['_id']] = counter['value']
+    return values
+
+
+def reconcile(models):
+    """Recompute every counter fed by ``models`` from their collections."""
+    tally = Tally()
+    prefixes = set()
+    for model in models:
+        prefixes.update(model.counter_prefixes)
+        for document in model.objects.only(*model.counter_fields).as_pymongo():
+            tally.update(model._from_son(document).counter_keys())
+
+    now = datetime.utcnow()
+    collection = Counter._get_collection()
+    stale = [
+        counter['_id'] for counter in collection.find({}, {'_id': 1})
+        if counter['_id'].split(':')[0] in prefixes and counter['_id'] not in tally
+    ]
+    operations = [
+        UpdateOne({'_id': name}, {'$set': {'value': value, 'updated_at': now}}, upsert=True)
+        for name, value in tally.items()
+    ] + [
+        UpdateOne({'_id': name}, {'$set': {'value': 0, 'updated_at': now}})
+        for name in stale
+    ]
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+    return len(tally)
+
+
+class CountedDocument:
+    """Mixin for documents that feed counters; list it before ``Document``.
+
+    Subclasses set ``counter_prefixes`` (the namespaces they own),
+    ``counter_fields`` (what ``counter_keys`` reads) and implement
+    ``counter_keys``. Loading a document only copies its counter fields;
+    the keys are worked out when a save changes one of them.
+    """
+    counter_prefixes = ()
+    counter_fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        # Document's metaclass can't be combined with ABCMeta, so check here
+        super().__init_subclass__(**kwargs)
+        if getattr(cls.counter_keys, '__isabstractmethod__', False) and not cls._meta.get('abstract'):
+            raise TypeError(f'{cls.__name__} must implement counter_keys')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._counted = set() if self._created else None  # None until needed
+        self._counted_values = None if self._created else {
+            field: _copy(self._data.get(field)) for field in self.counter_fields
+        }
+
+    @abc.abstractmethod
+    def counter_keys(self):
+        """Names of the counters this document currently adds one to."""
+
+    def save(self, *args, **kwargs):
+        changed = self._created or any(
+            name.split('.')[0] in self.counter_fields for name in self._get_changed_fields()
+        )
+        result = super().save(*args, **kwargs)
+        if changed:
+            self._recount(self.counter_keys())
+        return result
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._recount(set())
+        return result
+
+    def _loaded_keys(self):
+        if self._counted is None:
+            # counter_keys only reads counter_fields, so the loaded values stand in for the document
+            self._counted = type(self).counter_keys(SimpleNamespace(**self._counted_values))
+        return self._counted
+
+    def _recount(self, current):
+        counted = self._loaded_keys()
+        deltas = {name: 1 for name in current - counted}
+        deltas.update({name: -1 for name in counted - current})
+        self._counted = current
+        if deltas:
+            try:
+                increment(deltas)
+            except Exception:
+                # The document is already written; reconciliation repairs the counter
+                logger.exception('Counter update failed')
+
+
+def _copy(value):
+    # Lists are edited in place (alert.responders.append), so keep the loaded items
+    return list(value) if isinstance(value, list) else value
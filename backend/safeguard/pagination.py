@@ -0,0 +1,105 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is the sort key of the last item on a page, base64-encoded so
+clients treat it as opaque. The next page is everything strictly after that
+key in the sort order, which an index on the same fields answers directly,
+so page 500 costs the same as page 1 and rows inserted meanwhile can't shift
+items between pages. The sort must end in ``id`` to make the key unique.
+Querysets may yield documents or raw dicts (``as_pymongo()``).
+"""
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+
+
+def sort_value(document, field):
+    field = field.lstrip('-+')
+    if isinstance(document, dict):
+        return document.get('_id' if field == 'id' else field)
+    return getattr(document, field)
+
+
+def encode_cursor(document, sort):
+    values = []
+    for field in sort:
+        value = sort_value(document, field)
+        if isinstance(value, datetime):
+            value = {'$date': value.isoformat()}
+        elif isinstance(value, ObjectId):
+            value = {'$oid': str(value)}
+        values.append(value)
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """Sort key values of a cursor; raises ValueError when it's malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(sort):
+            raise ValueError
+        decoded = []
+        for value in values:
+            if isinstance(value, dict) and '$date' in value:
+                value = datetime.fromisoformat(value['$date'])
+            elif isinstance(value, dict) and '$oid' in value:
+                value = ObjectId(value['$oid'])
+            decoded.append(value)
+        return decoded
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def after_cursor(cursor, sort):
+    """Raw query for the items strictly after ``cursor`` in ``sort`` order.
+
+    ``sort`` uses ``order_by`` syntax, e.g. ``['-created_at', '-id']``.
+    """
+    values = decode_cursor(cursor, sort)
+    fields = ['_id' if field.lstrip('-+') == 'id' else field.lstrip('-+') for field in sort]
+
+    clauses = []
+    for i, field in enumerate(sort):
+        clause = {fields[j]: values[j] for j in range(i)}
+        clause[fields[i]] = {'$lt' if field.startswith('-') else '$gt': values[i]}
+        clauses.append(clause)
+    return {'$or': clauses}
+
+
+def paginate(queryset, sort, limit, cursor=None):
+    """``(items, next_cursor)``; ``next_cursor`` is None on the last page."""
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    if cursor:
+        queryset = queryset.filter(__raw__=after_cursor(cursor, sort))
+    items = list(queryset.order_by(*sort).limit(limit + 1))
+    if len(items) > limit:
+        return items[:limit], encode_cursor(items[limit - 1], sort)
+    return items, None
+
+
+def _none_first(value):
+    return (value is not None, value)
+
+
+def paginate_merged(querysets, sort, limit, cursor=None):
+    """``paginate`` over several querysets (e.g. a collection and its archive) as one sequence."""
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    items, seen = [], set()
+    for queryset in querysets:
+        if cursor:
+            queryset = queryset.filter(__raw__=after_cursor(cursor, sort))
+        for item in queryset.order_by(*sort).limit(limit + 1):
+            # A document being moved between querysets can briefly be in both; the first one wins
+            if sort_value(item, 'id') not in seen:
+                seen.add(sort_value(item, 'id'))
+                items.append(item)
+    # Stable sorts, least significant field first; missing values sort lowest, as in MongoDB
+    for field in reversed(sort):
+        items.sort(key=lambda item: _none_first(sort_value(item, field)), reverse=field.startswith('-'))
+    if len(items) > limit:
+        return items[:limit], encode_cursor(items[limit - 1], sort)
+    return items, None
@@ -0,0 +1,40 @@
+"""
+orjson-based JSON renderer for DRF.
+
+orjson serializes dicts, lists, numbers and naive ``datetime`` objects in C,
+several times faster than the stdlib encoder DRF uses. Datetimes come out
+exactly like ``datetime.isoformat()``, so views can hand over raw pymongo
+values (see ``safety.serializers``) without formatting them first.
+"""
+from decimal import Decimal
+
+import orjson
+from bson import ObjectId
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+
+
+def default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Promise):  # lazy translations
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, 'tolist'):  # NumPy scalars and arrays
+        return value.tolist()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        options = orjson.OPT_NON_STR_KEYS
+        if accepted_media_type and 'indent=' in accepted_media_type:
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=default, option=options)
@@ -71,6 +71,7 @@ CORS_ALLOW_HEADERS = [
 ]
 
 WSGI_APPLICATION = 'safeguard.wsgi.application'
+ASGI_APPLICATION = 'safeguard.asgi.application'
 
 # MongoDB Atlas Configuration
 import mongoengine
@@ -99,6 +100,10 @@ REST_FRAMEWORK = {
    'DEFAULT_AUTHENTICATION_CLASSES': (
     'accounts.authentication.MongoJWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': [
+        'safeguard.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
@@ -157,6 +162,74 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Long Polling Configuration
+# Waiters sleep on safety.notifications.sos_hub, so there is no polling interval
 LONG_POLL_TIMEOUT = 30  # seconds
-LONG_POLL_CHECK_INTERVAL = 1  # seconds
+
+# Server-Sent Events for the SOS monitor
+SOS_EVENT_BUFFER_SIZE = 1000  # events kept for Last-Event-ID resume
+SSE_HEARTBEAT_INTERVAL = 15  # seconds
+SSE_TICKET_TTL = 30  # seconds a stream ticket stays redeemable (single use)
+
+# Cross-process fan-out of SOS events. Use LocalSocketBackplane for several
+# workers on one host and MongoBackplane when workers run on several hosts.
+SOS_BACKPLANE = {
+    'BACKEND': config('SOS_BACKPLANE', default='safety.backplane.InProcessBackplane'),
+    'OPTIONS': {},
+}
+
+# SOS dispatch: nearest available volunteers
+VOLUNTEER_LOCATOR = config('VOLUNTEER_LOCATOR', default='memory')  # 'memory' or 'mongo' ($near on 2dsphere)
+VOLUNTEER_INDEX_REFRESH = 60  # seconds between full reloads of the in-memory index
+SOS_DISPATCH_COUNT = 5
+SOS_DISPATCH_RADIUS = 5000  # meters
+SOS_SAFE_ZONE_COUNT = 3  # nearest help points stored on each alert
+SOS_SAFE_ZONE_RADIUS = 10000  # meters
+SAFE_ZONE_INDEX_CHECK = 10  # seconds between checks for edited safe zones
+
+# Map clustering: below this zoom get_map_data returns grid-cell clusters
+MAP_CLUSTER_MAX_ZOOM = 13
+MAP_CLUSTER_CELLS_PER_TILE = 4
+MAP_CLUSTER_CACHE_TTL = 60  # seconds
+MAP_CLUSTER_INCIDENT_DAYS = 90
+
+# Write-behind buffer for location pings (accounts.location_buffer)
+LOCATION_FLUSH_INTERVAL = 2.0  # seconds
+LOCATION_FLUSH_MAX_PENDING = 500  # users waiting before an early flush
+LOCATION_HISTORY_BUCKET_SECONDS = 60  # one LocationTrail document per user per bucket
+
+# Risk zones derived from incident reports (safety.risk_engine).
+# Run `manage.py rebuild_risk_zones` periodically so levels follow the decay.
+RISK_CELL_SIZE = 0.005  # degrees, roughly 550 m
+RISK_HALF_LIFE_DAYS = 30
+RISK_ZONE_MIN_SCORE = 3.0
+
+# Incident heatmap tiles (safety.heatmap)
+HEATMAP_GRID_SIZE = 32  # cells per tile side
+HEATMAP_CACHE_SIZE = 2048  # tiles kept per process
+HEATMAP_CACHE_TTL = 300  # seconds; reports from other workers show up after this
+HEATMAP_BASE_ZOOM = 6  # tiles at this zoom and below are summed from one map-wide aggregation
+
+# Safe walking routes (safety.routing).
+# Build the graph with `manage.py build_street_graph <extract.geojson>`.
+STREET_GRAPH_PATH = config('STREET_GRAPH_PATH', default=str(BASE_DIR / 'data' / 'street_graph'))
+ROUTE_RISK_REFRESH = 300  # seconds between edge risk recomputations per worker
+ROUTE_INCIDENT_DAYS = 30  # incidents older than this no longer affect routes
+ROUTE_INCIDENT_RADIUS = 100  # meters around an incident whose streets are penalized
+ROUTE_MAX_SNAP_DISTANCE = 500  # meters from start/destination to the nearest graph node
+
+# Authenticated user cache (accounts.user_cache)
+USER_CACHE_SIZE = 10000  # users kept per process
+USER_CACHE_TTL = 30  # seconds; edits made by other workers show up after this
+JWT_VERIFIED_CACHE_SIZE = 4096  # access tokens whose signature is already checked, kept until exp
+
+# Conditional GET (safeguard.versions)
+COLLECTION_VERSION_REFRESH = 1.0  # seconds; writes from other workers change ETags after this
+ANNOUNCEMENT_ETAG_REFRESH = 60  # seconds; expired announcements drop out of cached responses after this
+
+# map-data delta sync (safeguard.changes)
+SYNC_GRACE_SECONDS = 5  # writes this close to a cursor are sent again, covering in-flight commits
+SYNC_TOMBSTONE_DAYS = 7  # deletions are remembered this long; older cursors get 410 and must reload
+
+# SOS alert archive (safety.archive). Run `manage.py archive_sos_alerts` daily.
+SOS_ARCHIVE_AFTER_DAYS = 30  # closed alerts older than this leave the hot collection
 DEBUG = True
@@ -0,0 +1,63 @@
+"""
+Chunked JSON responses for large list endpoints.
+
+Views build their payload as a dict whose big sections are iterators
+(typically ``map(serializer, queryset.as_pymongo())``). With ``?stream=1``
+the dict is written out incrementally: each section's items are encoded one
+by one while the Mongo cursor is read, and flushed in ``chunk_size`` pieces,
+so memory stays flat however many records match. Otherwise ``materialize``
+turns the iterators into lists for a normal ``Response``.
+
+Items that are already ``bytes`` are taken to be encoded JSON (see
+``safety.layer_cache``) and copied into the output unchanged. Payloads that
+contain them are sent with ``json_response`` instead of a ``Response``.
+
+Once streaming has started the status code is already sent, so a failure
+halfway through truncates the body instead of returning a 500.
+"""
+from collections.abc import Iterator
+
+import orjson
+from django.http import HttpResponse, StreamingHttpResponse
+
+from .renderers import default
+
+
+def wants_stream(request):
+    return request.GET.get('stream') in ('1', 'true')
+
+
+def materialize(data):
+    return {key: list(value) if isinstance(value, Iterator) else value for key, value in data.items()}
+
+
+def json_chunks(data, chunk_size=64 * 1024):
+    buffer = bytearray(b'{')
+    for position, (key, value) in enumerate(data.items()):
+        if position:
+            buffer += b','
+        buffer += orjson.dumps(str(key)) + b':'
+
+        if not isinstance(value, Iterator):
+            buffer += orjson.dumps(value, default=default)
+            continue
+
+        buffer += b'['
+        for index, item in enumerate(value):
+            if index:
+                buffer += b','
+            buffer += item if isinstance(item, bytes) else orjson.dumps(item, default=default)
+            if len(buffer) >= chunk_size:
+                yield bytes(buffer)
+                buffer.clear()
+        buffer += b']'
+    buffer += b'}'
+    yield bytes(buffer)
+
+
+def streaming_response(data, status=200):
+    return StreamingHttpResponse(json_chunks(data), status=status, content_type='application/json')
+
+
+def json_response(data, status=200):
+    return HttpResponse(b''.join(json_chunks(data)), status=status, content_type='application/json')
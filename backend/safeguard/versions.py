@@ -0,0 +1,135 @@
+"""
+Collection version stamps and conditional GET.
+
+Every write to a tracked collection bumps a counter in ``collection_versions``
+(``VersionedDocument`` does it on ``save``/``delete``, raw bulk writers call
+``bump`` themselves). ``conditional`` derives a response's ETag from the
+versions of the collections it reads, the user and the request URL, so a
+matching ``If-None-Match`` is answered with ``304 Not Modified`` before the
+view runs a single query.
+
+Versions are read with one ``$in`` query and then reused for
+``COLLECTION_VERSION_REFRESH`` seconds. Writes in this process update the
+local copy straight away; writes in other workers can go unnoticed for up
+to that long.
+"""
+import hashlib
+import logging
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from mongoengine import Document, StringField, IntField
+from pymongo import ReturnDocument
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+
+class CollectionVersion(Document):
+    name = StringField(primary_key=True)
+    version = IntField(default=0)
+
+    meta = {'collection': 'collection_versions'}
+
+
+class VersionCache:
+    def __init__(self, refresh=1.0):
+        self.refresh = refresh
+        self._versions = {}  # name -> (read_at, version)
+        self._lock = threading.Lock()
+
+    def get(self, names):
+        now = time.monotonic()
+        stale = [name for name in names if now - self._versions.get(name, (-self.refresh, 0))[0] >= self.refresh]
+        if stale:
+            found = {
+                document['_id']: document['version']
+                for document in CollectionVersion._get_collection().find({'_id': {'$in': stale}})
+            }
+            with self._lock:
+                for name in stale:
+                    self._versions[name] = (now, found.get(name, 0))
+        return tuple(self._versions[name][1] for name in names)
+
+    def bump(self, *names):
+        collection = CollectionVersion._get_collection()
+        for name in names:
+            document = collection.find_one_and_update(
+                {'_id': name}, {'$inc': {'version': 1}}, upsert=True, return_document=ReturnDocument.AFTER
+            )
+            with self._lock:
+                self._versions[name] = (time.monotonic(), document['version'])
+
+
+versions = VersionCache(getattr(settings, 'COLLECTION_VERSION_REFRESH', 1.0))
+
+
+def bump(*names):
+    try:
+        versions.bump(*names)
+    except Exception:
+        # Worst case clients re-download once the version moves again
+        logger.exception('Version bump failed')
+
+
+class VersionedDocument:
+    """Mixin that bumps the document's collection version on every write."""
+
+    def save(self, *args, **kwargs):
+        result = super().save(*args, **kwargs)
+        bump(self._meta['collection'])
+        return result
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump(self._meta['collection'])
+        return result
+
+
+def etag_matches(header, etag):
+    """Whether an ``If-None-Match`` header lists ``etag`` (weak comparison, as RFC 9110 asks)."""
+    if header.strip() == '*':
+        return True
+    candidates = (candidate.strip() for candidate in header.split(','))
+    return etag in (candidate[2:] if candidate.startswith('W/') else candidate for candidate in candidates)
+
+
+def conditional(*collections, refresh=None):
+    """ETag / 304 support for a GET view that reads ``collections``.
+
+    ``collections`` may instead be a single function of the request, for
+    views whose sources depend on the user. ``refresh`` (seconds) also rolls
+    the ETag over on a clock, for payloads that change with time alone
+    (expiring announcements, day windows).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            user = request.user
+            names = collections[0](request) if len(collections) == 1 and callable(collections[0]) else collections
+            key = (
+                view.__name__,
+                tuple(names),
+                versions.get(names),
+                str(getattr(user, 'id', '')),
+                getattr(user, 'role', ''),
+                request.get_full_path(),
+                int(time.time() // refresh) if refresh else None,
+            )
+            etag = '"' + hashlib.sha1(repr(key).encode()).hexdigest() + '"'
+
+            if etag_matches(request.META.get('HTTP_IF_NONE_MATCH', ''), etag):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                response['ETag'] = etag
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,85 @@
+"""
+Hot/cold tiering for SOS alerts.
+
+Long-poll, the SSE stream, map-data and the alert list all query
+``sos_alerts``. Alerts resolved or cancelled more than
+``SOS_ARCHIVE_AFTER_DAYS`` ago are moved to ``sos_alerts_archive``
+(``SOSAlertArchive``), which keeps the hot collection and its indexes small.
+
+``archive_alerts`` runs in ``_id`` order, one batch at a time:
+
+1. upsert the batch into the archive
+2. delete it from the hot collection
+3. save the last ``_id`` in an ``ArchiveRun`` document
+
+A run that is killed resumes from there, with the cutoff it started with.
+Replaying a batch is harmless because the copies are upserts keyed by
+``_id``.
+
+Counters keep including archived alerts. Delta-sync clients already got
+these alerts as removed when they were closed, so no tombstones are written.
+Only the user's own history (``history_querysets``) reads both tiers.
+Location trails expire (``LocationTrail``'s 30-day TTL) before an alert is
+old enough to archive, so the trail endpoint only looks at hot alerts.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from pymongo import ReplaceOne
+
+from safeguard.versions import bump
+from .models import ArchiveRun, SOSAlert, SOSAlertArchive
+
+CLOSED_STATUSES = ['resolved', 'cancelled']
+
+
+def archive_alerts(batch_size=500, restart=False, log=None):
+    """Move closed alerts older than the cutoff to the archive; returns how many moved this call."""
+    run = ArchiveRun.objects(name='sos_alerts').first()
+    if run is None or run.finished_at or restart:
+        days = getattr(settings, 'SOS_ARCHIVE_AFTER_DAYS', 30)
+        run = ArchiveRun(name='sos_alerts', cutoff=datetime.utcnow() - timedelta(days=days))
+        run.save()
+
+    hot, cold = SOSAlert._get_collection(), SOSAlertArchive._get_collection()
+    eligible = {'status': {'$in': CLOSED_STATUSES}, 'updated_at': {'$lt': run.cutoff}}
+    moved = 0
+    while True:
+        query = dict(eligible, _id={'$gt': run.last_id}) if run.last_id else eligible
+        batch = list(hot.find(query).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+
+        now = datetime.utcnow()
+        cold.bulk_write([
+            ReplaceOne({'_id': alert['_id']}, _archived(alert, now), upsert=True) for alert in batch
+        ], ordered=False)
+        # Re-check the filter so an alert updated meanwhile stays hot (and only hot)
+        ids = [alert['_id'] for alert in batch]
+        if hot.delete_many(dict(eligible, _id={'$in': ids})).deleted_count < len(ids):
+            cold.delete_many({'_id': {'$in': hot.distinct('_id', {'_id': {'$in': ids}})}})
+
+        moved += len(batch)
+        run.last_id = batch[-1]['_id']
+        run.archived += len(batch)
+        run.updated_at = now
+        run.save()
+        if log:
+            log(f'{run.archived} alerts archived (up to {run.last_id})')
+
+    run.finished_at = datetime.utcnow()
+    run.save()
+    if moved:
+        bump('sos_alerts', 'sos_alerts_archive')
+    return moved
+
+
+def _archived(alert, now):
+    alert = {key: value for key, value in alert.items() if key not in ('location', 'change_seq')}
+    alert['archived_at'] = now
+    return alert
+
+
+def history_querysets(**filters):
+    """Hot and archived alerts matching ``filters``, for ``paginate_merged``."""
+    return [SOSAlert.objects(**filters), SOSAlertArchive.objects(**filters)]
@@ -0,0 +1,163 @@
+"""
+Pub/sub backplanes that carry SOS alert events between processes.
+
+The notification hub publishes through a backplane and the backplane calls
+back into every subscribed hub, on this process and on all the others:
+
+* ``InProcessBackplane`` - single process, no I/O (development default).
+* ``LocalSocketBackplane`` - Unix datagram sockets in a shared directory, for
+  several workers on one host (and for tests/benchmarks).
+* ``MongoBackplane`` - tails a capped MongoDB collection, for workers spread
+  over several hosts.
+"""
+import abc
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class BaseBackplane(abc.ABC):
+    def __init__(self, **options):
+        self.options = options
+        self.origin = uuid.uuid4().hex
+        self._deliver = None
+
+    def start(self, deliver):
+        """Begin delivering events from every publisher to ``deliver(event, payload)``."""
+        self._deliver = deliver
+
+    @abc.abstractmethod
+    def publish(self, event, payload):
+        """Deliver ``(event, payload)`` to this process and every other subscriber."""
+
+    def close(self):
+        pass
+
+
+class InProcessBackplane(BaseBackplane):
+    def publish(self, event, payload):
+        self._deliver(event, payload)
+
+
+class LocalSocketBackplane(BaseBackplane):
+    MAX_DATAGRAM = 65536
+
+    def __init__(self, path='/tmp/safeguard-sos', **options):
+        super().__init__(path=path, **options)
+        self.path = path
+        self._socket = None
+        self._address = None
+
+    def start(self, deliver):
+        super().start(deliver)
+        os.makedirs(self.path, exist_ok=True)
+        self._address = os.path.join(self.path, f'{os.getpid()}-{self.origin[:8]}.sock')
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(self._address)
+        threading.Thread(target=self._listen, name='sos-backplane', daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                data = self._socket.recv(self.MAX_DATAGRAM)
+            except OSError:
+                return  # socket closed
+            # One bad datagram or failing delivery must not stop this worker's notifications
+            try:
+                message = json.loads(data)
+                self._deliver(message['event'], message['payload'])
+            except Exception:
+                logger.exception('Dropped SOS backplane message')
+
+    def publish(self, event, payload):
+        self._deliver(event, payload)
+
+        data = json.dumps({'event': event, 'payload': payload}).encode()
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sender.setblocking(False)  # a peer with a full queue must not stall the publisher
+        try:
+            for name in os.listdir(self.path):
+                peer = os.path.join(self.path, name)
+                if peer == self._address or not name.endswith('.sock'):
+                    continue
+                try:
+                    sender.sendto(data, peer)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Worker went away without cleaning up
+                    _unlink_quietly(peer)
+                except BlockingIOError:
+                    logger.warning('SOS backplane peer %s is backed up, dropped %s event', peer, event)
+        finally:
+            sender.close()
+
+    def close(self):
+        if self._socket:
+            self._socket.close()
+            _unlink_quietly(self._address)
+
+
+class MongoBackplane(BaseBackplane):
+    def __init__(self, collection='sos_events', size=16 * 1024 * 1024, **options):
+        super().__init__(collection=collection, size=size, **options)
+        self.collection_name = collection
+        self.size = size
+        self._collection = None
+        self._closed = False
+
+    def start(self, deliver):
+        from mongoengine.connection import get_db
+        from pymongo.errors import CollectionInvalid
+
+        super().start(deliver)
+        db = get_db()
+        try:
+            db.create_collection(self.collection_name, capped=True, size=self.size)
+        except CollectionInvalid:
+            pass  # already exists
+        self._collection = db[self.collection_name]
+        threading.Thread(target=self._tail, name='sos-backplane', daemon=True).start()
+
+    def _tail(self):
+        from pymongo import CursorType
+
+        # Only events published after this process joined are interesting
+        newest = self._collection.find_one(sort=[('$natural', -1)])
+        last_id = newest['_id'] if newest else None
+
+        while not self._closed:
+            query = {'_id': {'$gt': last_id}} if last_id else {}
+            cursor = self._collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                while cursor.alive and not self._closed:
+                    for document in cursor:
+                        last_id = document['_id']
+                        if document['origin'] != self.origin:
+                            self._deliver(document['event'], document['payload'])
+            except Exception:
+                logger.exception('SOS backplane cursor failed, reopening')
+                time.sleep(1)
+            finally:
+                cursor.close()
+
+            if last_id is None:
+                time.sleep(0.1)  # tailable cursors on an empty collection die immediately
+
+    def publish(self, event, payload):
+        self._deliver(event, payload)
+        self._collection.insert_one({'origin': self.origin, 'event': event, 'payload': payload})
+
+    def close(self):
+        self._closed = True
+
+
+def _unlink_quietly(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,144 @@
+"""
+Server-side clustering of map layers for zoomed-out views.
+
+Points are binned into square lat/lng cells sized from the map zoom level
+(``MAP_CLUSTER_CELLS_PER_TILE`` cells across one 256px tile) with NumPy,
+giving one record per occupied cell with its count, centroid and severity
+mix. Each (layer, zoom) result is cached for ``MAP_CLUSTER_CACHE_TTL``
+seconds and viewport requests just pick the cached cells they can see.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+
+from accounts.models import User
+from .models import IncidentReport, RiskZone
+
+SEVERITY_LEVELS = ['low', 'medium', 'high', 'critical']
+
+
+def cell_size_for_zoom(zoom):
+    cells_per_tile = getattr(settings, 'MAP_CLUSTER_CELLS_PER_TILE', 4)
+    return 360.0 / (2 ** zoom) / cells_per_tile
+
+
+def cluster_points(latitudes, longitudes, severities, cell_size):
+    """Bin points into cells; ``severities`` holds indexes into SEVERITY_LEVELS or -1."""
+    if len(latitudes) == 0:
+        return []
+
+    rows = np.floor(latitudes / cell_size).astype(np.int64)
+    cols = np.floor(longitudes / cell_size).astype(np.int64)
+    keys = (rows + (1 << 30)) << 32 | (cols + (1 << 30))
+    cells, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+
+    centroid_lat = np.bincount(inverse, weights=latitudes) / counts
+    centroid_lng = np.bincount(inverse, weights=longitudes) / counts
+
+    levels = len(SEVERITY_LEVELS)
+    graded = severities >= 0
+    severity_mix = np.bincount(
+        inverse[graded] * levels + severities[graded], minlength=len(cells) * levels
+    ).reshape(len(cells), levels)
+
+    cell_rows = (cells >> 32) - (1 << 30)
+    cell_cols = (cells & 0xFFFFFFFF) - (1 << 30)
+
+    clusters = []
+    for i in range(len(cells)):
+        row, col = int(cell_rows[i]), int(cell_cols[i])
+        cluster = {
+            'cell': f'{row}:{col}',
+            'latitude': round(float(centroid_lat[i]), 6),
+            'longitude': round(float(centroid_lng[i]), 6),
+            'count': int(counts[i]),
+            'bounds': [col * cell_size, row * cell_size, (col + 1) * cell_size, (row + 1) * cell_size],
+        }
+        if severity_mix[i].any():
+            cluster['severity'] = dict(zip(SEVERITY_LEVELS, (int(n) for n in severity_mix[i])))
+        clusters.append(cluster)
+    return clusters
+
+
+def _points(documents, latitude_field, longitude_field, severity_field=None):
+    latitudes, longitudes, severities = [], [], []
+    for document in documents:
+        latitudes.append(document[latitude_field])
+        longitudes.append(document[longitude_field])
+        severity = document.get(severity_field) if severity_field else None
+        severities.append(SEVERITY_LEVELS.index(severity) if severity in SEVERITY_LEVELS else -1)
+    return np.array(latitudes, dtype=float), np.array(longitudes, dtype=float), np.array(severities, dtype=np.int64)
+
+
+def incident_points():
+    days = getattr(settings, 'MAP_CLUSTER_INCIDENT_DAYS', 90)
+    reports = IncidentReport.objects(
+        status__ne='dismissed',
+        incident_time__gte=datetime.utcnow() - timedelta(days=days)
+    ).only('latitude', 'longitude', 'severity').as_pymongo()
+    return _points(reports, 'latitude', 'longitude', 'severity')
+
+
+def risk_zone_points():
+    zones = RiskZone.objects(is_active=True).only('latitude', 'longitude', 'risk_level').as_pymongo()
+    return _points(zones, 'latitude', 'longitude', 'risk_level')
+
+
+def volunteer_points():
+    volunteers = User.objects(
+        role='volunteer',
+        is_verified=True,
+        is_active=True,
+        share_location__ne=False,
+        current_latitude__exists=True,
+        current_longitude__exists=True
+    ).only('current_latitude', 'current_longitude').as_pymongo()
+    return _points(volunteers, 'current_latitude', 'current_longitude')
+
+
+LAYERS = {
+    'incidents': incident_points,
+    'risk_zones': risk_zone_points,
+    'volunteers': volunteer_points,
+}
+
+
+class ClusterCache:
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._entries = {}  # (layer, zoom) -> (computed_at, clusters)
+        self._points = {}  # layer -> (loaded_at, arrays), shared by every zoom level
+        self._lock = threading.Lock()
+
+    def _layer_points(self, layer):
+        entry = self._points.get(layer)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            entry = (time.monotonic(), LAYERS[layer]())
+            with self._lock:
+                self._points[layer] = entry
+        return entry[1]
+
+    def clusters(self, layer, zoom, viewport=None):
+        key = (layer, zoom)
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            latitudes, longitudes, severities = self._layer_points(layer)
+            clusters = cluster_points(latitudes, longitudes, severities, cell_size_for_zoom(zoom))
+            entry = (time.monotonic(), clusters)
+            with self._lock:
+                self._entries[key] = entry
+
+        if viewport is None:
+            return entry[1]
+        return [cluster for cluster in entry[1] if viewport.contains(cluster['latitude'], cluster['longitude'])]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._points.clear()
+
+
+cluster_cache = ClusterCache(getattr(settings, 'MAP_CLUSTER_CACHE_TTL', 60))
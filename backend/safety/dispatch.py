@@ -0,0 +1,114 @@
+"""
+Nearest-volunteer matching for SOS dispatch.
+
+Two interchangeable locators answer "k nearest available volunteers within
+a radius":
+
+* ``MemoryVolunteerLocator`` keeps a ``GridIndex`` of available volunteers
+  in process memory, reloaded from MongoDB every ``VOLUNTEER_INDEX_REFRESH``
+  seconds and patched in place on location updates.
+* ``MongoVolunteerLocator`` runs a ``$near`` query against the 2dsphere
+  index on ``User.location``.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from accounts.models import User
+from .geo import GridIndex, haversine
+
+
+def is_available(user):
+    return (
+        user.role == 'volunteer'
+        and user.is_verified
+        and user.is_active
+        and user.share_location is not False
+        and user.current_latitude is not None
+        and user.current_longitude is not None
+    )
+
+
+def volunteer_entry(user):
+    return {
+        'id': str(user.id),
+        'name': user.name,
+        'latitude': user.current_latitude,
+        'longitude': user.current_longitude,
+        'last_update': user.last_location_update.isoformat() if user.last_location_update else None,
+    }
+
+
+def available_volunteers():
+    return User.objects(
+        role='volunteer',
+        is_verified=True,
+        is_active=True,
+        share_location__ne=False,
+        current_latitude__exists=True,
+        current_longitude__exists=True
+    ).only('id', 'name', 'role', 'is_verified', 'is_active', 'share_location',
+           'current_latitude', 'current_longitude', 'last_location_update')
+
+
+class MemoryVolunteerLocator:
+    def __init__(self, refresh_interval=60):
+        self.refresh_interval = refresh_interval
+        self._index = GridIndex()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _ensure_fresh(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_interval:
+                return
+            index = GridIndex()
+            for user in available_volunteers():
+                index.insert(str(user.id), user.current_latitude, user.current_longitude, volunteer_entry(user))
+            self._index = index
+            self._loaded_at = time.monotonic()
+
+    def update(self, user):
+        if self._loaded_at is None:
+            return  # nothing loaded yet; the first query reads fresh data
+        with self._lock:
+            if is_available(user):
+                self._index.insert(str(user.id), user.current_latitude, user.current_longitude, volunteer_entry(user))
+            else:
+                self._index.remove(str(user.id))
+
+    def nearest(self, latitude, longitude, k=5, radius=None, exclude=()):
+        self._ensure_fresh()
+        # update() edits the index in place, so the walk must not overlap it
+        with self._lock:
+            found = self._index.nearest(latitude, longitude, k, radius, exclude)
+        return [dict(entry, distance=round(distance, 1)) for distance, _, entry in found]
+
+
+class MongoVolunteerLocator:
+    def update(self, user):
+        pass  # User.save keeps the indexed location in sync
+
+    def nearest(self, latitude, longitude, k=5, radius=None, exclude=()):
+        if k < 1:
+            return []
+        query = {'location__near': [longitude, latitude]}
+        if radius is not None:
+            query['location__max_distance'] = radius
+        if exclude:
+            query['id__nin'] = list(exclude)
+        volunteers = available_volunteers().filter(**query).limit(k)
+        return [
+            dict(volunteer_entry(user), distance=round(
+                haversine(latitude, longitude, user.current_latitude, user.current_longitude), 1))
+            for user in volunteers
+        ]
+
+
+if getattr(settings, 'VOLUNTEER_LOCATOR', 'memory') == 'mongo':
+    volunteer_locator = MongoVolunteerLocator()
+else:
+    volunteer_locator = MemoryVolunteerLocator(getattr(settings, 'VOLUNTEER_INDEX_REFRESH', 60))
@@ -0,0 +1,211 @@
+"""
+Geospatial helpers shared by the safety views.
+
+``GridIndex`` buckets points into fixed-size lat/lng cells so radius and
+k-nearest lookups only look at the cells around the query point instead of
+scanning every record.
+"""
+import heapq
+import math
+from collections import defaultdict
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """Great-circle distance in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_many(latitude, longitude, latitudes, longitudes):
+    """Vectorized ``haversine`` from one point (or array) to arrays of points."""
+    phi1, phi2 = np.radians(latitude), np.radians(latitudes)
+    a = (np.sin((phi2 - phi1) / 2) ** 2
+         + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(longitudes - longitude) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class Viewport:
+    """The visible map area: a ``bbox`` or a ``center`` plus ``radius``."""
+
+    def __init__(self, bbox=None, center=None, radius=None):
+        self.bbox = bbox  # (west, south, east, north)
+        self.center = center  # (latitude, longitude)
+        self.radius = radius  # meters
+
+    @classmethod
+    def from_params(cls, params):
+        """Parse ``bbox=west,south,east,north`` or ``center=lat,lng&radius=meters``.
+
+        Returns None when the request has no viewport and raises ValueError on
+        malformed values.
+        """
+        if params.get('bbox'):
+            west, south, east, north = (float(value) for value in params['bbox'].split(','))
+            if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+                raise ValueError('bbox must be west,south,east,north in degrees')
+            return cls(bbox=(west, south, east, north))
+
+        if params.get('center'):
+            latitude, longitude = (float(value) for value in params['center'].split(','))
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                raise ValueError('center must be lat,lng in degrees')
+            radius = float(params.get('radius', 1000))
+            if radius <= 0:
+                raise ValueError('radius must be positive')
+            return cls(center=(latitude, longitude), radius=radius)
+
+        return None
+
+    def query(self, field='location', latitude='latitude'):
+        """mongoengine filter kwargs answered by the field's 2dsphere index.
+
+        A bbox means the plain lat/lng rectangle, as in ``contains``. Polygon
+        edges are geodesics: meridians already are, but parallels bow poleward.
+        So the box is cut into pieces at most 90 degrees wide whose edges are
+        moved out until their geodesics clear the box, and a range on
+        ``latitude`` trims the extra strip off again.
+        """
+        if self.bbox:
+            west, south, east, north = self.bbox
+            # west > east crosses the antimeridian: one span on each side of it
+            spans = [(west, east)] if west <= east else [(west, 180), (-180, east)]
+            polygons = []
+            for left, right in spans:
+                count = max(1, math.ceil((right - left) / 90))
+                width = (right - left) / count
+                # A geodesic between two points on one parallel peaks midway at
+                # atan(tan(lat) / cos(half_span)); only an edge on the equator side bows inward
+                shrink = math.cos(math.radians(width) / 2)
+                bottom = math.degrees(math.atan(math.tan(math.radians(south)) * shrink)) if south > 0 else south
+                top = math.degrees(math.atan(math.tan(math.radians(north)) * shrink)) if north < 0 else north
+                bottom, top = max(bottom, -89.9), min(top, 89.9)
+                for i in range(count):
+                    piece_left, piece_right = left + i * width, left + (i + 1) * width
+                    polygons.append([[
+                        [piece_left, bottom], [piece_right, bottom], [piece_right, top],
+                        [piece_left, top], [piece_left, bottom],
+                    ]])
+            if len(polygons) == 1:
+                geometry = {'type': 'Polygon', 'coordinates': polygons[0]}
+            else:
+                geometry = {'type': 'MultiPolygon', 'coordinates': polygons}
+            return {f'{field}__geo_within': geometry, f'{latitude}__gte': south, f'{latitude}__lte': north}
+        latitude, longitude = self.center
+        return {f'{field}__geo_within_sphere': [[longitude, latitude], self.radius / EARTH_RADIUS_M]}
+
+    def contains(self, latitude, longitude):
+        if latitude is None or longitude is None:
+            return False
+        if self.bbox:
+            west, south, east, north = self.bbox
+            in_longitude = west <= longitude <= east if west <= east else longitude >= west or longitude <= east
+            return south <= latitude <= north and in_longitude
+        return haversine(self.center[0], self.center[1], latitude, longitude) <= self.radius
+
+
+class GridIndex:
+    """Not thread-safe: callers that share one across threads must lock around every call."""
+    def __init__(self, cell_size=0.01):
+        self.cell_size = cell_size  # degrees, ~1.1 km of latitude
+        self._cells = defaultdict(dict)  # cell -> {key: (lat, lng, item)}
+        self._positions = {}  # key -> cell
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_size), math.floor(lng / self.cell_size))
+
+    def insert(self, key, lat, lng, item=None):
+        self.remove(key)
+        cell = self._cell(lat, lng)
+        self._cells[cell][key] = (lat, lng, item)
+        self._positions[key] = cell
+
+    def remove(self, key):
+        cell = self._positions.pop(key, None)
+        if cell is not None:
+            bucket = self._cells[cell]
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def nearest(self, lat, lng, k=5, radius=None, exclude=()):
+        """Up to ``k`` ``(distance, key, item)`` tuples, closest first, within ``radius`` meters.
+
+        Keys in ``exclude`` are skipped, so they never take up one of the ``k`` places.
+        """
+        if k < 1:
+            return []
+        center_row, center_col = self._cell(lat, lng)
+        best = []  # max-heap of (-distance, key, item)
+        seen = 0
+        ring = 0
+
+        while True:
+            # Nothing in this ring can be closer than the gap to its inner edge
+            reach = max(ring - 1, 0) * self.cell_size
+            cos_lat = math.cos(math.radians(min(89.9, abs(lat) + reach)))
+            min_distance = reach * METERS_PER_DEGREE * cos_lat
+
+            if radius is not None and min_distance > radius:
+                break
+            if len(best) == k and min_distance > -best[0][0]:
+                break
+            if seen == len(self._positions):
+                break
+
+            if 8 * ring > len(self._cells):
+                # Sparse index: cheaper to sweep every occupied cell left over
+                cells = [
+                    cell for cell in self._cells
+                    if max(abs(cell[0] - center_row), abs(cell[1] - center_col)) >= ring
+                ]
+                ring = math.inf
+            else:
+                cells = _ring_cells(center_row, center_col, ring)
+
+            for cell in cells:
+                bucket = self._cells.get(cell)
+                if not bucket:
+                    continue
+                seen += len(bucket)
+                for key, (point_lat, point_lng, item) in bucket.items():
+                    if key in exclude:
+                        continue
+                    distance = haversine(lat, lng, point_lat, point_lng)
+                    if radius is not None and distance > radius:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, key, item))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, key, item))
+
+            if ring == math.inf:
+                break
+            ring += 1
+
+        return sorted(((-distance, key, item) for distance, key, item in best), key=lambda result: result[0])
+
+
+def _ring_cells(center_row, center_col, ring):
+    if ring == 0:
+        yield center_row, center_col
+        return
+    for col in range(center_col - ring, center_col + ring + 1):
+        yield center_row - ring, col
+        yield center_row + ring, col
+    for row in range(center_row - ring + 1, center_row + ring):
+        yield row, center_col - ring
+        yield row, center_col + ring
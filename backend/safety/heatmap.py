@@ -0,0 +1,175 @@
+"""
+Incident density heatmap tiles.
+
+A tile is the usual Web Mercator ``z/x/y`` square split into a
+``HEATMAP_GRID_SIZE`` x ``HEATMAP_GRID_SIZE`` grid of report counts, so the
+response size is constant however many reports fall inside it. Counting is
+done by MongoDB: an aggregation maps each report to its grid cell and groups,
+so only one count per occupied cell reaches the web process.
+
+Tiles at ``HEATMAP_BASE_ZOOM`` and further out are summed from one
+aggregation of the whole map at that zoom, cached per filter set, instead of
+each scanning every report. Finished tiles are cached and dropped when a new
+report lands inside them.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from .geo import Viewport
+from .models import IncidentReport
+
+
+def tile_bounds(z, x, y):
+    """(west, south, east, north) of a Web Mercator tile."""
+    n = 2 ** z
+
+    def latitude(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return x / n * 360 - 180, latitude(y + 1), (x + 1) / n * 360 - 180, latitude(y)
+
+
+def tile_for(latitude, longitude, z):
+    n = 2 ** z
+    latitude = max(min(latitude, 85.0511), -85.0511)
+    x = int((longitude + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2 * n)
+    return min(x, n - 1), min(y, n - 1)
+
+
+def cell_expressions(z, size):
+    """Aggregation expressions for a report's map-wide grid column and row at zoom ``z``."""
+    scale = 2 ** z * size
+    latitude = {'$max': [{'$min': ['$latitude', 85.0511]}, -85.0511]}
+    mercator = {'$asinh': {'$tan': {'$degreesToRadians': latitude}}}
+    column = {'$floor': {'$multiply': [{'$divide': [{'$add': ['$longitude', 180]}, 360]}, scale]}}
+    row = {'$floor': {'$multiply': [{'$subtract': [0.5, {'$divide': [mercator, 2 * math.pi]}]}, scale]}}
+    return column, row
+
+
+def tile_query(west, south, east, north):
+    """Filter kwargs matching every report inside a tile."""
+    return Viewport(bbox=(west, south, east, north)).query()
+
+
+class HeatmapTiles:
+    base_cache_size = 64  # filter sets whose map-wide cells are kept
+
+    def __init__(self, grid_size=32, cache_size=2048, ttl=300, base_zoom=6):
+        self.grid_size = grid_size
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.base_zoom = base_zoom
+        self._cache = OrderedDict()  # (z, x, y, filters) -> (created_at, payload)
+        self._base = OrderedDict()  # filters -> (created_at, cells at base_zoom)
+        self._lock = threading.Lock()
+
+    def tile(self, z, x, y, incident_types=None, severities=None, since=None, until=None):
+        filters = (tuple(incident_types or ()), tuple(severities or ()), since, until)
+        key = (z, x, y, filters)
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                self._cache.move_to_end(key)
+                return entry[1]
+
+        payload = self._render(z, x, y, filters)
+
+        with self._lock:
+            self._cache[key] = (time.monotonic(), payload)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return payload
+
+    def _render(self, z, x, y, filters):
+        west, south, east, north = tile_bounds(z, x, y)
+        if z <= self.base_zoom:
+            columns, rows, counts = self._base_cells(filters)
+            shift = self.base_zoom - z
+            columns, rows = columns >> shift, rows >> shift
+        else:
+            columns, rows, counts = self._cells(dict(tile_query(west, south, east, north), **_filter_query(*filters)), z)
+
+        size = self.grid_size
+        columns, rows = columns - x * size, rows - y * size
+        inside = (columns >= 0) & (columns < size) & (rows >= 0) & (rows < size)
+        grid = np.bincount(rows[inside] * size + columns[inside], weights=counts[inside], minlength=size * size)
+        grid = grid.astype(np.int64)
+
+        return {
+            'z': z,
+            'x': x,
+            'y': y,
+            'bounds': [west, south, east, north],
+            'size': size,
+            'total': int(grid.sum()),
+            'max': int(grid.max()) if grid.size else 0,
+            'counts': grid.tolist(),  # row-major, north-west first
+        }
+
+    def _base_cells(self, filters):
+        with self._lock:
+            entry = self._base.get(filters)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                self._base.move_to_end(filters)
+                return entry[1]
+
+        cells = self._cells(_filter_query(*filters), self.base_zoom)
+
+        with self._lock:
+            self._base[filters] = (time.monotonic(), cells)
+            self._base.move_to_end(filters)
+            while len(self._base) > self.base_cache_size:
+                self._base.popitem(last=False)
+        return cells
+
+    def _cells(self, query, z):
+        """``(columns, rows, counts)`` of the occupied map-wide grid cells at zoom ``z``."""
+        column, row = cell_expressions(z, self.grid_size)
+        pipeline = [
+            {'$match': IncidentReport.objects(**query)._query},
+            {'$group': {'_id': {'column': column, 'row': row}, 'count': {'$sum': 1}}},
+        ]
+        cells = list(IncidentReport._get_collection().aggregate(pipeline))
+        # Reports on the antimeridian or the clamped poles land one cell past the edge
+        last = 2 ** z * self.grid_size - 1
+        columns = np.array([cell['_id']['column'] for cell in cells], dtype=np.int64).clip(0, last)
+        rows = np.array([cell['_id']['row'] for cell in cells], dtype=np.int64).clip(0, last)
+        counts = np.array([cell['count'] for cell in cells], dtype=np.int64)
+        return columns, rows, counts
+
+    def invalidate_point(self, latitude, longitude):
+        """Drop cached tiles (any zoom, any filter) that contain a new report."""
+        with self._lock:
+            stale = [key for key in self._cache if tile_for(latitude, longitude, key[0]) == (key[1], key[2])]
+            for key in stale:
+                del self._cache[key]
+            self._base.clear()
+
+
+def _filter_query(incident_types, severities, since, until):
+    query = {'status__ne': 'dismissed'}
+    if incident_types:
+        query['incident_type__in'] = list(incident_types)
+    if severities:
+        query['severity__in'] = list(severities)
+    if since:
+        query['incident_time__gte'] = since
+    if until:
+        query['incident_time__lte'] = until
+    return query
+
+
+heatmap_tiles = HeatmapTiles(
+    grid_size=getattr(settings, 'HEATMAP_GRID_SIZE', 32),
+    cache_size=getattr(settings, 'HEATMAP_CACHE_SIZE', 2048),
+    ttl=getattr(settings, 'HEATMAP_CACHE_TTL', 300),
+    base_zoom=getattr(settings, 'HEATMAP_BASE_ZOOM', 6),
+)
@@ -0,0 +1,79 @@
+"""
+Pre-serialized safe zone and risk zone layers for map-data.
+
+Both collections change a few times a day but are part of every map-data
+response. Each worker keeps every active zone already encoded as JSON bytes,
+next to NumPy arrays of their coordinates. The layer is stamped with its
+collection version (``safeguard.versions``). The model save/delete hooks and
+the risk engine bump that version, so a stale layer is reloaded in one query
+on the next request. Other workers notice within
+``COLLECTION_VERSION_REFRESH`` seconds. A viewport is applied in memory
+with a vectorized mask, and the encoded items go into the response unchanged
+(see ``safeguard.streaming.json_chunks``).
+"""
+import threading
+
+import numpy as np
+import orjson
+
+from safeguard.renderers import default
+from safeguard.versions import versions
+from . import serializers
+from .models import SafeZone, RiskZone
+from .geo import haversine_many
+
+LAYERS = {
+    'safe_zones': (SafeZone, serializers.safe_zone),
+    'risk_zones': (RiskZone, serializers.risk_zone),
+}
+
+
+def viewport_mask(viewport, latitudes, longitudes):
+    """Vectorized ``Viewport.contains``."""
+    if viewport.bbox:
+        west, south, east, north = viewport.bbox
+        if west <= east:
+            in_longitude = (longitudes >= west) & (longitudes <= east)
+        else:
+            in_longitude = (longitudes >= west) | (longitudes <= east)
+        return (latitudes >= south) & (latitudes <= north) & in_longitude
+    latitude, longitude = viewport.center
+    return haversine_many(latitude, longitude, latitudes, longitudes) <= viewport.radius
+
+
+class LayerCache:
+    def __init__(self):
+        self._layers = {}  # name -> (version, latitudes, longitudes, encoded items)
+        self._lock = threading.Lock()
+
+    def items(self, name, viewport=None):
+        """Encoded active zones of layer ``name``, optionally only those in ``viewport``."""
+        version = versions.get((name,))[0]
+        entry = self._layers.get(name)
+        if entry is None or entry[0] != version:
+            with self._lock:
+                entry = self._layers.get(name)
+                if entry is None or entry[0] != version:
+                    # Writes landing during the load just trigger another reload
+                    entry = self._load(name, version)
+                    self._layers[name] = entry
+
+        _, latitudes, longitudes, items = entry
+        if viewport is None:
+            return items
+        return [items[i] for i in np.flatnonzero(viewport_mask(viewport, latitudes, longitudes))]
+
+    def clear(self):
+        with self._lock:
+            self._layers.clear()
+
+    def _load(self, name, version):
+        model, serializer = LAYERS[name]
+        documents = list(model.objects(is_active=True).only(*serializer.fields).as_pymongo())
+        latitudes = np.array([document['latitude'] for document in documents], dtype=float)
+        longitudes = np.array([document['longitude'] for document in documents], dtype=float)
+        items = [orjson.dumps(serializer(document), default=default) for document in documents]
+        return version, latitudes, longitudes, items
+
+
+layer_cache = LayerCache()
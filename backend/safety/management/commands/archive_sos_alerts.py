@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from safety import archive
+
+
+class Command(BaseCommand):
+    help = 'Move resolved and cancelled SOS alerts older than SOS_ARCHIVE_AFTER_DAYS to the archive collection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--restart', action='store_true', help='Start a new run instead of resuming an unfinished one')
+
+    def handle(self, *args, **options):
+        moved = archive.archive_alerts(options['batch_size'], options['restart'], log=self.stdout.write)
+        self.stdout.write(f'{moved} alerts archived')
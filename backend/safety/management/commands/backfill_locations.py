@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+from safeguard.versions import bump
+from safety.models import SOSAlert, IncidentReport, SafeZone, RiskZone
+
+
+def point_from(latitude_field, longitude_field):
+    return [{'$set': {'location': {
+        'type': 'Point',
+        'coordinates': [f'${longitude_field}', f'${latitude_field}'],
+    }}}]
+
+
+class Command(BaseCommand):
+    help = 'Populate GeoJSON location fields from the stored latitude/longitude pairs'
+
+    def handle(self, *args, **options):
+        # Runs server-side as pipeline updates, so no documents are pulled into Python
+        result = User._get_collection().update_many(
+            {'current_latitude': {'$type': 'number'}, 'current_longitude': {'$type': 'number'}},
+            point_from('current_latitude', 'current_longitude')
+        )
+        User.ensure_indexes()
+        if result.modified_count:
+            bump('users', 'volunteer_locations')
+        self.stdout.write(f'users: {result.modified_count} updated')
+
+        for model in [SOSAlert, IncidentReport, SafeZone, RiskZone]:
+            result = model._get_collection().update_many(
+                {'latitude': {'$type': 'number'}, 'longitude': {'$type': 'number'}},
+                point_from('latitude', 'longitude')
+            )
+            model.ensure_indexes()
+            if result.modified_count:
+                bump(model._meta['collection'])
+            self.stdout.write(f'{model._meta["collection"]}: {result.modified_count} updated')
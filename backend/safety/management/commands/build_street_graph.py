@@ -0,0 +1,85 @@
+import json
+import os
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from safety.geo import haversine_many
+
+# OSM highway types pedestrians can't use
+NOT_WALKABLE = {'motorway', 'motorway_link', 'trunk', 'trunk_link'}
+
+
+class Command(BaseCommand):
+    help = 'Convert a GeoJSON street extract (LineStrings, e.g. from OSM) into the memory-mapped graph used by safe-route'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='GeoJSON FeatureCollection of LineString/MultiLineString streets')
+        parser.add_argument('--output', help='Graph directory (defaults to STREET_GRAPH_PATH)')
+
+    def handle(self, *args, **options):
+        output = options['output'] or getattr(settings, 'STREET_GRAPH_PATH', None)
+        if not output:
+            raise CommandError('Pass --output or set STREET_GRAPH_PATH')
+
+        with open(options['source']) as f:
+            features = json.load(f).get('features', [])
+
+        node_ids = {}
+        sources, targets = [], []
+
+        def node_for(coordinate):
+            # ~1 cm precision merges the shared endpoints of adjoining ways
+            key = (round(coordinate[1], 7), round(coordinate[0], 7))
+            return node_ids.setdefault(key, len(node_ids))
+
+        for feature in features:
+            geometry = feature.get('geometry') or {}
+            if (feature.get('properties') or {}).get('highway') in NOT_WALKABLE:
+                continue
+            if geometry.get('type') == 'LineString':
+                lines = [geometry['coordinates']]
+            elif geometry.get('type') == 'MultiLineString':
+                lines = geometry['coordinates']
+            else:
+                continue
+            for line in lines:
+                nodes = [node_for(coordinate) for coordinate in line]
+                for a, b in zip(nodes, nodes[1:]):
+                    if a != b:
+                        sources += [a, b]
+                        targets += [b, a]
+
+        if not sources:
+            raise CommandError('No street segments found in the source file')
+
+        coordinates = np.array(list(node_ids), dtype=np.float64)
+        node_lat, node_lng = coordinates[:, 0], coordinates[:, 1]
+
+        # Drop duplicate segments, then sort by source for the CSR layout
+        edges = np.unique(np.stack([sources, targets], axis=1), axis=0)
+        sources, targets = edges[:, 0], edges[:, 1]
+        indptr = np.zeros(len(node_lat) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(node_lat)), out=indptr[1:])
+        lengths = haversine_many(node_lat[sources], node_lng[sources], node_lat[targets], node_lng[targets])
+
+        # Latitude-sorted lookups, so workers don't each build them at startup
+        node_by_lat = np.argsort(node_lat)
+        mid_lat = (node_lat[sources] + node_lat[targets]) / 2
+        mid_lng = (node_lng[sources] + node_lng[targets]) / 2
+        edge_by_lat = np.argsort(mid_lat)
+
+        os.makedirs(output, exist_ok=True)
+        np.save(os.path.join(output, 'node_lat.npy'), node_lat)
+        np.save(os.path.join(output, 'node_lng.npy'), node_lng)
+        np.save(os.path.join(output, 'indptr.npy'), indptr)
+        np.save(os.path.join(output, 'indices.npy'), targets.astype(np.int32))
+        np.save(os.path.join(output, 'lengths.npy'), lengths.astype(np.float32))
+        np.save(os.path.join(output, 'node_by_lat.npy'), node_by_lat.astype(np.int32))
+        np.save(os.path.join(output, 'node_lat_sorted.npy'), node_lat[node_by_lat])
+        np.save(os.path.join(output, 'edge_by_lat.npy'), edge_by_lat.astype(np.int64))
+        np.save(os.path.join(output, 'edge_mid_lat.npy'), mid_lat[edge_by_lat])
+        np.save(os.path.join(output, 'edge_mid_lng.npy'), mid_lng[edge_by_lat])
+
+        self.stdout.write(f'{len(node_lat)} nodes and {len(targets)} directed edges written to {output}')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from safety import risk_engine
+
+
+class Command(BaseCommand):
+    help = 'Refresh derived risk zone levels, or rebuild every risk cell from the incident history with --full'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute all cells from incident reports')
+
+    def handle(self, *args, **options):
+        if options['full']:
+            zones = risk_engine.rebuild()
+        else:
+            zones = risk_engine.refresh_zones()
+        self.stdout.write(f'{zones} derived risk zones updated')
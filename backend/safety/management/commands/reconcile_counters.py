@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+from community.models import CommunityPost
+from safety.models import SOSAlert, SOSAlertArchive, IncidentReport, SafeZone
+from safeguard import counters
+from safeguard.versions import bump
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialized stats counters from the source collections'
+
+    def handle(self, *args, **options):
+        models = [User, SOSAlert, SOSAlertArchive, IncidentReport, SafeZone, CommunityPost]
+        total = counters.reconcile(models)
+        # Stats responses are cached by the versions of their source collections
+        bump(*(model._meta['collection'] for model in models))
+        self.stdout.write(f'{total} counters reconciled')
@@ -1,7 +1,10 @@
-from mongoengine import Document, StringField, FloatField, DateTimeField, BooleanField, IntField, ListField
+from mongoengine import Document, StringField, FloatField, DateTimeField, BooleanField, IntField, ListField, PointField, DictField, ObjectIdField
 from datetime import datetime
+from safeguard.counters import CountedDocument
+from safeguard.versions import VersionedDocument
+from safeguard.changes import TrackedDocument
 
-class SOSAlert(Document):
+class SOSAlert(TrackedDocument, VersionedDocument, CountedDocument, Document):
     STATUS_CHOICES = [
         ('active', 'Active'),
         ('responded', 'Responded'),
@@ -20,22 +23,42 @@ class SOSAlert(Document):
     user_name = StringField(required=True)
     latitude = FloatField(required=True)
     longitude = FloatField(required=True)
+    location = PointField()  # GeoJSON mirror of latitude/longitude (2dsphere indexed)
     address = StringField()
     status = StringField(choices=STATUS_CHOICES, default='active')
     priority = StringField(choices=PRIORITY_CHOICES, default='high')
     message = StringField()
     responders = ListField(StringField())  # List of volunteer user IDs
+    nearest_safe_zones = ListField(DictField())  # Closest help points when the alert was raised
     created_at = DateTimeField(default=datetime.utcnow)
     updated_at = DateTimeField(default=datetime.utcnow)
     resolved_at = DateTimeField()
+    change_seq = IntField()  # Delta sync position (safeguard.changes)
     
     meta = {
         'collection': 'sos_alerts',
-        'indexes': ['user_id', 'status', 'created_at', 'priority']
+        'indexes': [
+            'user_id', 'status', 'created_at', 'priority', 'change_seq', 'updated_at',
+            # list_sos_alerts: keyset pages and updated_since polling
+            ('status', '-created_at', '-id'),
+            ('user_id', '-created_at', '-id'),
+            ('status', 'updated_at', 'id'),
+        ]
     }
     
+    counter_prefixes = ('sos_alerts',)
+    counter_fields = ('user_id', 'status', 'responders')
+    
+    def counter_keys(self):
+        keys = {'sos_alerts', f'sos_alerts:user:{self.user_id}'}
+        if self.status == 'active':
+            keys.add('sos_alerts:active')
+        keys.update(f'sos_alerts:responder:{responder}' for responder in self.responders)
+        return keys
+    
     def save(self, *args, **kwargs):
         self.updated_at = datetime.utcnow()
+        self.location = [self.longitude, self.latitude]
         return super().save(*args, **kwargs)
     
     def to_dict(self):
@@ -50,12 +73,58 @@ class SOSAlert(Document):
             'priority': self.priority,
             'message': self.message,
             'responders': self.responders,
+            'nearest_safe_zones': self.nearest_safe_zones,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
         }
 
-class IncidentReport(Document):
+class SOSAlertArchive(Document):
+    """Resolved and cancelled alerts moved out of ``sos_alerts`` by ``archive_sos_alerts``.
+
+    Copies keep their ``_id``; the GeoJSON ``location`` and ``change_seq`` are dropped.
+    """
+    user_id = StringField(required=True)
+    user_name = StringField(required=True)
+    latitude = FloatField(required=True)
+    longitude = FloatField(required=True)
+    address = StringField()
+    status = StringField(choices=SOSAlert.STATUS_CHOICES)
+    priority = StringField(choices=SOSAlert.PRIORITY_CHOICES)
+    message = StringField()
+    responders = ListField(StringField())
+    nearest_safe_zones = ListField(DictField())
+    created_at = DateTimeField()
+    updated_at = DateTimeField()
+    resolved_at = DateTimeField()
+    archived_at = DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'sos_alerts_archive',
+        'strict': False,
+        'indexes': [('user_id', '-created_at', '-id'), 'created_at']
+    }
+    
+    # Archived alerts still count towards the totals (see reconcile_counters)
+    counter_prefixes = ()
+    counter_fields = SOSAlert.counter_fields
+    counter_keys = SOSAlert.counter_keys
+    
+    to_dict = SOSAlert.to_dict
+
+class ArchiveRun(Document):
+    """Progress of the current (or last) ``archive_sos_alerts`` run (see safety.archive)."""
+    name = StringField(primary_key=True)
+    cutoff = DateTimeField(required=True)
+    last_id = ObjectIdField()
+    archived = IntField(default=0)
+    started_at = DateTimeField(default=datetime.utcnow)
+    updated_at = DateTimeField(default=datetime.utcnow)
+    finished_at = DateTimeField()
+
+    meta = {'collection': 'archive_runs'}
+
+class IncidentReport(VersionedDocument, CountedDocument, Document):
     TYPE_CHOICES = [
         ('harassment', 'Harassment'),
         ('suspicious_activity', 'Suspicious Activity'),
@@ -76,6 +145,7 @@ class IncidentReport(Document):
     severity = StringField(choices=SEVERITY_CHOICES, required=True)
     latitude = FloatField(required=True)
     longitude = FloatField(required=True)
+    location = PointField()  # GeoJSON mirror of latitude/longitude (2dsphere indexed)
     address = StringField()
     description = StringField(required=True)
     incident_time = DateTimeField(required=True)
@@ -94,9 +164,30 @@ class IncidentReport(Document):
         'indexes': ['user_id', 'incident_type', 'severity', 'status', 'created_at']
     }
     
+    counter_prefixes = ('incident_reports',)
+    counter_fields = ('user_id',)
+    
+    def counter_keys(self):
+        keys = {'incident_reports'}
+        if self.user_id:
+            keys.add(f'incident_reports:user:{self.user_id}')
+        return keys
+    
     def save(self, *args, **kwargs):
         self.updated_at = datetime.utcnow()
-        return super().save(*args, **kwargs)
+        self.location = [self.longitude, self.latitude]
+        previous_status = None
+        if not self._created and 'status' in self._get_changed_fields():
+            previous_status = IncidentReport.objects(id=self.id).scalar('status').first()
+        result = super().save(*args, **kwargs)
+        if previous_status and (previous_status == 'dismissed') != (self.status == 'dismissed'):
+            # Keep the derived risk cells in step with dismissals
+            from . import risk_engine
+            if self.status == 'dismissed':
+                risk_engine.retract_incident(self)
+            else:
+                risk_engine.record_incident(self)
+        return result
     
     def to_dict(self):
         return {
@@ -115,10 +206,11 @@ class IncidentReport(Document):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
 
-class SafeZone(Document):
+class SafeZone(TrackedDocument, VersionedDocument, CountedDocument, Document):
     name = StringField(required=True)
     latitude = FloatField(required=True)
     longitude = FloatField(required=True)
+    location = PointField()  # GeoJSON mirror of latitude/longitude (2dsphere indexed)
     radius = FloatField(default=500)  # meters
     zone_type = StringField(choices=[
         ('police_station', 'Police Station'),
@@ -130,12 +222,25 @@ class SafeZone(Document):
     description = StringField()
     is_active = BooleanField(default=True)
     created_at = DateTimeField(default=datetime.utcnow)
+    updated_at = DateTimeField(default=datetime.utcnow)
+    change_seq = IntField()  # Delta sync position (safeguard.changes)
     
     meta = {
         'collection': 'safe_zones',
-        'indexes': ['zone_type', 'is_active']
+        'indexes': ['zone_type', 'is_active', 'updated_at', 'change_seq']
     }
     
+    counter_prefixes = ('safe_zones',)
+    counter_fields = ('is_active',)
+    
+    def counter_keys(self):
+        return {'safe_zones:active'} if self.is_active else set()
+    
+    def save(self, *args, **kwargs):
+        self.updated_at = datetime.utcnow()
+        self.location = [self.longitude, self.latitude]
+        return super().save(*args, **kwargs)
+    
     def to_dict(self):
         return {
             'id': str(self.id),
@@ -149,10 +254,11 @@ class SafeZone(Document):
             'created_at': self.created_at.isoformat() if self.created_at else None,
         }
 
-class RiskZone(Document):
+class RiskZone(TrackedDocument, VersionedDocument, Document):
     name = StringField(required=True)
     latitude = FloatField(required=True)
     longitude = FloatField(required=True)
+    location = PointField()  # GeoJSON mirror of latitude/longitude (2dsphere indexed)
     radius = FloatField(default=200)  # meters
     risk_level = StringField(choices=[
         ('low', 'Low'),
@@ -162,17 +268,23 @@ class RiskZone(Document):
     ], required=True)
     description = StringField()
     incident_count = IntField(default=0)
+    cell_key = StringField()  # set on zones derived by safety.risk_engine
     is_active = BooleanField(default=True)
     created_at = DateTimeField(default=datetime.utcnow)
     updated_at = DateTimeField(default=datetime.utcnow)
+    change_seq = IntField()  # Delta sync position (safeguard.changes)
     
     meta = {
         'collection': 'risk_zones',
-        'indexes': ['risk_level', 'is_active', 'incident_count']
+        'indexes': [
+            'risk_level', 'is_active', 'incident_count', 'change_seq', 'updated_at',
+            {'fields': ['cell_key'], 'sparse': True},
+        ]
     }
     
     def save(self, *args, **kwargs):
         self.updated_at = datetime.utcnow()
+        self.location = [self.longitude, self.latitude]
         return super().save(*args, **kwargs)
     
     def to_dict(self):
@@ -189,3 +301,19 @@ class RiskZone(Document):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
+
+class RiskCell(Document):
+    """Running, time-decayed incident score for one grid cell (see safety.risk_engine)."""
+    cell_key = StringField(required=True, unique=True)
+    row = IntField(required=True)
+    col = IntField(required=True)
+    weight = FloatField(default=0)  # severity weights scaled to the engine's reference epoch
+    incident_count = IntField(default=0)
+    latitude_sum = FloatField(default=0)
+    longitude_sum = FloatField(default=0)
+    updated_at = DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'risk_cells',
+        'indexes': ['updated_at']
+    }
@@ -0,0 +1,124 @@
+"""
+In-process notification hub for SOS alert changes.
+
+Long-poll waiters park here instead of re-querying MongoDB on a timer.
+The SOS write paths call ``publish`` and every parked waiter (threaded or
+asyncio) wakes up and runs its query once. The most recent events are kept
+in a ring buffer so SSE clients can resume from a ``Last-Event-ID``.
+
+Events travel through the configured ``SOS_BACKPLANE`` so a write on one
+worker or host wakes waiters everywhere (see ``safety.backplane``).
+"""
+import asyncio
+import os
+import threading
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class SOSNotificationHub:
+    def __init__(self, buffer_size=1000, backplane_config=None):
+        self._backplane_config = backplane_config or {'BACKEND': 'safety.backplane.InProcessBackplane'}
+        self._backplane = None
+        self._backplane_pid = None
+        self._backplane_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._sequence = 0
+        self._events = deque(maxlen=buffer_size)  # (sequence, event, payload)
+        self._async_waiters = set()  # (loop, future) pairs
+        # Sequences restart with the process, so event ids carry an epoch
+        self.epoch = uuid.uuid4().hex[:8]
+
+    @property
+    def sequence(self):
+        return self._sequence
+
+    def _ensure_backplane(self):
+        # Started lazily (and again after a fork) so pre-forking servers
+        # don't share one listener thread between workers
+        if self._backplane_pid != os.getpid():
+            with self._backplane_lock:
+                if self._backplane_pid != os.getpid():
+                    backplane_class = import_string(self._backplane_config['BACKEND'])
+                    backplane = backplane_class(**self._backplane_config.get('OPTIONS', {}))
+                    backplane.start(self._deliver)
+                    self._backplane = backplane
+                    self._backplane_pid = os.getpid()
+        return self._backplane
+
+    def publish(self, event, payload=None):
+        self._ensure_backplane().publish(event, payload)
+
+    def _deliver(self, event, payload):
+        with self._condition:
+            self._sequence += 1
+            self._events.append((self._sequence, event, payload))
+            self._condition.notify_all()
+            waiters = list(self._async_waiters)
+            self._async_waiters.clear()
+
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def events_since(self, since):
+        """Events after ``since``, or None if they already fell out of the buffer."""
+        with self._condition:
+            if since >= self._sequence:
+                return []
+            if not self._events or self._events[0][0] > since + 1:
+                return None
+            return [item for item in self._events if item[0] > since]
+
+    def event_id(self, sequence):
+        return f'{self.epoch}-{sequence}'
+
+    def parse_event_id(self, event_id):
+        """Sequence for an event id issued by this process, else None."""
+        if not event_id:
+            return None
+        epoch, _, sequence = event_id.partition('-')
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        sequence = int(sequence)
+        return sequence if sequence <= self._sequence else None
+
+    def wait(self, since, timeout):
+        """Block the calling thread until the sequence moves past ``since``."""
+        self._ensure_backplane()  # so events from other workers can wake us
+        with self._condition:
+            return self._condition.wait_for(lambda: self._sequence > since, timeout=timeout)
+
+    async def wait_async(self, since, timeout):
+        """Park the calling coroutine until the sequence moves past ``since``."""
+        self._ensure_backplane()  # so events from other workers can wake us
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+
+        with self._condition:
+            if self._sequence > since:
+                return True
+            self._async_waiters.add(waiter)
+
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._condition:
+                self._async_waiters.discard(waiter)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+sos_hub = SOSNotificationHub(
+    getattr(settings, 'SOS_EVENT_BUFFER_SIZE', 1000),
+    getattr(settings, 'SOS_BACKPLANE', None),
+)
@@ -0,0 +1,220 @@
+"""
+Risk zones derived from incident reports.
+
+Reports are bucketed into square grid cells of ``RISK_CELL_SIZE`` degrees.
+Each cell keeps a severity-weighted score that halves every
+``RISK_HALF_LIFE_DAYS``. To keep updates to a single atomic ``$inc``, a
+report's weight is stored scaled to a fixed reference epoch::
+
+    stored = weight * 2 ** ((incident_time - EPOCH) / half_life)
+    score  = stored * 2 ** -((now - EPOCH) / half_life)
+
+so the decay never has to be applied to the stored value. Cells whose
+score crosses ``RISK_ZONE_MIN_SCORE`` are materialized as ``RiskZone``
+documents (linked by ``cell_key``) and deactivated once they decay below it.
+
+``record_incident`` is the incremental path used by ``create_incident_report``
+(``retract_incident`` undoes it when a report is dismissed);
+``rebuild`` recomputes every cell from the report history with NumPy and
+``refresh_zones`` re-evaluates materialized levels as scores decay.
+"""
+import math
+from datetime import datetime, timezone
+
+import numpy as np
+from django.conf import settings
+from pymongo import ReturnDocument, UpdateOne
+
+from safeguard.changes import next_sequence
+from safeguard.versions import bump
+
+from .geo import METERS_PER_DEGREE
+from .models import IncidentReport, RiskCell, RiskZone
+
+EPOCH = datetime(2024, 1, 1)
+SEVERITY_WEIGHTS = {'low': 1.0, 'medium': 2.0, 'high': 4.0, 'critical': 8.0}
+RISK_LEVELS = [('critical', 20.0), ('high', 8.0), ('medium', 3.0)]
+
+
+def _cell_size():
+    return getattr(settings, 'RISK_CELL_SIZE', 0.005)
+
+
+def _half_life_seconds():
+    return getattr(settings, 'RISK_HALF_LIFE_DAYS', 30) * 86400
+
+
+def _naive_utc(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def cell_key(row, col):
+    return f'{row}:{col}'
+
+
+def scaled_weight(severity, incident_time, now=None):
+    # A report dated in the future counts as happening now; it would also overflow
+    age = (min(_naive_utc(incident_time), now or datetime.utcnow()) - EPOCH).total_seconds()
+    return SEVERITY_WEIGHTS.get(severity, 1.0) * 2 ** (age / _half_life_seconds())
+
+
+def current_score(weight, now=None):
+    age = ((now or datetime.utcnow()) - EPOCH).total_seconds()
+    return weight * 2 ** -(age / _half_life_seconds())
+
+
+def risk_level(score):
+    for level, threshold in RISK_LEVELS:
+        if score >= threshold:
+            return level
+    return 'low'
+
+
+def record_incident(report):
+    """Fold one new report into its cell and update the derived zone."""
+    if report.status == 'dismissed':
+        return None
+    return _fold(report, 1)
+
+
+def retract_incident(report):
+    """Take a previously recorded report back out of its cell."""
+    return _fold(report, -1)
+
+
+def _fold(report, sign):
+    row = math.floor(report.latitude / _cell_size())
+    col = math.floor(report.longitude / _cell_size())
+    now = datetime.utcnow()
+    cell = RiskCell._get_collection().find_one_and_update(
+        {'cell_key': cell_key(row, col)},
+        {
+            '$inc': {
+                'weight': sign * scaled_weight(report.severity, report.incident_time, now),
+                'incident_count': sign,
+                'latitude_sum': sign * report.latitude,
+                'longitude_sum': sign * report.longitude,
+            },
+            '$set': {'updated_at': now},
+            '$setOnInsert': {'row': row, 'col': col},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    if cell['incident_count'] > 0:
+        RiskZone._get_collection().bulk_write([_zone_update(cell, now, next_sequence())])
+    else:
+        # Last report gone: drop the cell and switch its zone off
+        RiskCell._get_collection().delete_one({'_id': cell['_id'], 'incident_count': {'$lte': 0}})
+        RiskZone._get_collection().update_many(
+            {'cell_key': cell['cell_key']},
+            {'$set': {'is_active': False, 'updated_at': now, 'change_seq': next_sequence()}}
+        )
+    bump('risk_zones')
+    return cell
+
+
+def _zone_fields(cell, now):
+    score = current_score(cell['weight'], now)
+    latitude = cell['latitude_sum'] / cell['incident_count']
+    longitude = cell['longitude_sum'] / cell['incident_count']
+    return {
+        'latitude': latitude,
+        'longitude': longitude,
+        'location': {'type': 'Point', 'coordinates': [longitude, latitude]},
+        'risk_level': risk_level(score),
+        'incident_count': cell['incident_count'],
+        'is_active': score >= getattr(settings, 'RISK_ZONE_MIN_SCORE', 3.0),
+    }
+
+
+def _zone_update(cell, now=None, change_seq=None, fields=None):
+    now = now or datetime.utcnow()
+    return UpdateOne({'cell_key': cell['cell_key']}, {
+        '$set': dict(fields or _zone_fields(cell, now), updated_at=now, change_seq=change_seq),
+        '$setOnInsert': {
+            'name': f'Incident hotspot {cell["cell_key"]}',
+            'description': 'Derived from recent incident reports',
+            # Circle that covers the cell
+            'radius': round(_cell_size() * METERS_PER_DEGREE / math.sqrt(2)),
+            'created_at': now,
+        },
+    }, upsert=True)
+
+
+def refresh_zones():
+    """Re-evaluate every derived zone's level as cell scores decay.
+
+    Only zones whose level, activity or position actually changed are
+    written, so delta-sync clients aren't sent every zone on each run.
+    """
+    now = datetime.utcnow()
+    compared = ('latitude', 'longitude', 'risk_level', 'incident_count', 'is_active')
+    zones = RiskZone._get_collection().find({'cell_key': {'$exists': True}}, ['cell_key', *compared])
+    stored = {zone['cell_key']: tuple(zone.get(field) for field in compared) for zone in zones}
+    changed = []
+    for cell in RiskCell._get_collection().find():
+        fields = _zone_fields(cell, now)
+        if stored.get(cell['cell_key']) != tuple(fields[field] for field in compared):
+            changed.append((cell, fields))
+    if changed:
+        change_seq = next_sequence()
+        RiskZone._get_collection().bulk_write(
+            [_zone_update(cell, now, change_seq, fields) for cell, fields in changed], ordered=False
+        )
+        bump('risk_zones')
+    return len(changed)
+
+
+def rebuild():
+    """Recompute all cells from the full report history (vectorized backfill)."""
+    reports = list(IncidentReport.objects(status__ne='dismissed').only(
+        'latitude', 'longitude', 'severity', 'incident_time'
+    ).as_pymongo())
+
+    now = datetime.utcnow()
+    cells_collection = RiskCell._get_collection()
+    cells_collection.delete_many({})
+
+    if reports:
+        latitudes = np.array([report['latitude'] for report in reports], dtype=float)
+        longitudes = np.array([report['longitude'] for report in reports], dtype=float)
+        severity_weights = np.array([SEVERITY_WEIGHTS.get(report['severity'], 1.0) for report in reports])
+        ages = np.array([(report['incident_time'] - EPOCH).total_seconds() for report in reports])
+        ages = np.minimum(ages, (now - EPOCH).total_seconds())  # as in scaled_weight
+        weights = severity_weights * np.exp2(ages / _half_life_seconds())
+
+        rows = np.floor(latitudes / _cell_size()).astype(np.int64)
+        cols = np.floor(longitudes / _cell_size()).astype(np.int64)
+        cells, inverse = np.unique(np.stack([rows, cols], axis=1), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+
+        cell_weights = np.bincount(inverse, weights=weights)
+        counts = np.bincount(inverse)
+        latitude_sums = np.bincount(inverse, weights=latitudes)
+        longitude_sums = np.bincount(inverse, weights=longitudes)
+
+        cells_collection.insert_many([
+            {
+                'cell_key': cell_key(int(row), int(col)),
+                'row': int(row),
+                'col': int(col),
+                'weight': float(cell_weights[i]),
+                'incident_count': int(counts[i]),
+                'latitude_sum': float(latitude_sums[i]),
+                'longitude_sum': float(longitude_sums[i]),
+                'updated_at': now,
+            }
+            for i, (row, col) in enumerate(cells)
+        ])
+
+    # Zones whose cell no longer has any reports
+    live_keys = cells_collection.distinct('cell_key')
+    RiskZone._get_collection().update_many(
+        {'cell_key': {'$exists': True, '$nin': live_keys}},
+        {'$set': {'is_active': False, 'updated_at': now, 'change_seq': next_sequence()}}
+    )
+    bump('risk_zones')
+    return refresh_zones()
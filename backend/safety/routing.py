@@ -0,0 +1,206 @@
+"""
+Risk-weighted walking routes over a local street graph.
+
+The graph is a directory of ``.npy`` arrays written by the
+``build_street_graph`` command, in compressed sparse row layout:
+
+* ``node_lat.npy`` / ``node_lng.npy`` - float64 node coordinates
+* ``indptr.npy`` - int64, edges of node ``i`` are ``indptr[i]:indptr[i + 1]``
+* ``indices.npy`` - int32 edge targets
+* ``lengths.npy`` - float32 edge lengths in meters
+
+plus latitude-sorted lookup arrays for range and nearest-node searches:
+
+* ``node_by_lat.npy`` / ``node_lat_sorted.npy`` - node ids by latitude, and their latitudes
+* ``edge_by_lat.npy`` - edge ids by midpoint latitude
+* ``edge_mid_lat.npy`` / ``edge_mid_lng.npy`` - edge midpoints, in that order
+
+The arrays are opened with ``mmap_mode='r'`` so every worker on a host
+shares one copy through the page cache. Each worker only keeps its own
+per-edge cost array: length times a risk multiplier from nearby active
+``RiskZone`` documents and recent ``IncidentReport`` documents, refreshed
+every ``ROUTE_RISK_REFRESH`` seconds. Queries run A* with a straight-line
+heuristic, computed for the neighbours of each expanded node only, which
+stays admissible because multipliers are never below 1.
+"""
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+
+from .geo import METERS_PER_DEGREE, haversine, haversine_many
+from .models import IncidentReport, RiskZone
+
+ZONE_PENALTIES = {'low': 0.5, 'medium': 1.0, 'high': 2.0, 'critical': 4.0}
+INCIDENT_PENALTIES = {'low': 0.1, 'medium': 0.2, 'high': 0.5, 'critical': 1.0}
+WALKING_SPEED = 1.3  # meters per second
+
+
+class RouteNotFound(Exception):
+    pass
+
+
+class StreetGraph:
+    files = ('node_lat', 'node_lng', 'indptr', 'indices', 'lengths',
+             'node_by_lat', 'node_lat_sorted', 'edge_by_lat', 'edge_mid_lat', 'edge_mid_lng')
+
+    def __init__(self, path):
+        for name in self.files:
+            # Plain ndarray views of the maps skip np.memmap's per-slice overhead
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r').view(np.ndarray))
+
+    def edges_near(self, latitude, longitude, radius):
+        """Indexes of edges whose midpoint lies within ``radius`` meters."""
+        reach = radius / METERS_PER_DEGREE
+        start = np.searchsorted(self.edge_mid_lat, latitude - reach, side='left')
+        end = np.searchsorted(self.edge_mid_lat, latitude + reach, side='right')
+        distances = haversine_many(latitude, longitude, self.edge_mid_lat[start:end], self.edge_mid_lng[start:end])
+        return self.edge_by_lat[start:end][distances <= radius]
+
+    def nearest_node(self, latitude, longitude, reach=0.005):
+        """``(node, distance in meters)`` of the node closest to a point."""
+        # Equirectangular distance is plenty to pick the closest node. Search a
+        # latitude band, widening it until the best match lies inside the band.
+        scale = np.cos(np.radians(latitude))
+        while True:
+            start = np.searchsorted(self.node_lat_sorted, latitude - reach, side='left')
+            end = np.searchsorted(self.node_lat_sorted, latitude + reach, side='right')
+            if end > start:
+                nodes = self.node_by_lat[start:end]
+                distances = (self.node_lat_sorted[start:end] - latitude) ** 2 + ((self.node_lng[nodes] - longitude) * scale) ** 2
+                best = int(np.argmin(distances))
+                gap = float(np.sqrt(distances[best]))
+                if gap <= reach or end - start == len(self.node_by_lat):
+                    return int(nodes[best]), gap * METERS_PER_DEGREE
+            reach *= 4
+
+    def risk_multipliers(self, zones, incidents, incident_radius):
+        multipliers = np.ones(len(self.indices), dtype=np.float32)
+        for latitude, longitude, radius, level in zones:
+            multipliers[self.edges_near(latitude, longitude, radius)] += ZONE_PENALTIES.get(level, 1.0)
+        for latitude, longitude, severity in incidents:
+            multipliers[self.edges_near(latitude, longitude, incident_radius)] += INCIDENT_PENALTIES.get(severity, 0.2)
+        return multipliers
+
+    def astar(self, source, target, costs):
+        """Cheapest path from ``source`` to ``target`` as a list of node ids."""
+        target_lat, target_lng = float(self.node_lat[target]), float(self.node_lng[target])
+        best = {source: 0.0}
+        previous = {}
+        frontier = [(0.0, 0.0, source)]
+        closed = set()
+
+        while frontier:
+            _, cost, node = heapq.heappop(frontier)
+            if node == target:
+                path = [node]
+                while node in previous:
+                    node = previous[node]
+                    path.append(node)
+                return path[::-1]
+            if node in closed:
+                continue
+            closed.add(node)
+
+            start, end = self.indptr[node], self.indptr[node + 1]
+            neighbours = self.indices[start:end]
+            for neighbour, edge_cost, latitude, longitude in zip(
+                neighbours.tolist(), costs[start:end].tolist(),
+                self.node_lat[neighbours].tolist(), self.node_lng[neighbours].tolist()
+            ):
+                candidate = cost + edge_cost
+                if candidate < best.get(neighbour, float('inf')):
+                    best[neighbour] = candidate
+                    previous[neighbour] = node
+                    estimate = haversine(latitude, longitude, target_lat, target_lng)
+                    heapq.heappush(frontier, (candidate + estimate, candidate, neighbour))
+
+        raise RouteNotFound('No walkable route between these points')
+
+
+class SafeRouter:
+    def __init__(self, path, risk_refresh=300, incident_days=30, incident_radius=100, max_snap_distance=500):
+        self.path = path
+        self.max_snap_distance = max_snap_distance
+        self.risk_refresh = risk_refresh
+        self.incident_days = incident_days
+        self.incident_radius = incident_radius
+        self._graph = None
+        self._costs = None
+        self._costs_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        # Graphs built before the lookup arrays existed need a rebuild
+        return bool(self.path) and all(
+            os.path.exists(os.path.join(self.path, f'{name}.npy')) for name in StreetGraph.files
+        )
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            with self._lock:
+                if self._graph is None:
+                    self._graph = StreetGraph(self.path)
+        return self._graph
+
+    def _risk_costs(self):
+        if self._costs is not None and time.monotonic() - self._costs_at < self.risk_refresh:
+            return self._costs
+        with self._lock:
+            if self._costs is None or time.monotonic() - self._costs_at >= self.risk_refresh:
+                zones = [
+                    (zone['latitude'], zone['longitude'], zone.get('radius') or 200, zone['risk_level'])
+                    for zone in RiskZone.objects(is_active=True).only(
+                        'latitude', 'longitude', 'radius', 'risk_level').as_pymongo()
+                ]
+                incidents = [
+                    (report['latitude'], report['longitude'], report['severity'])
+                    for report in IncidentReport.objects(
+                        status__ne='dismissed',
+                        incident_time__gte=datetime.utcnow() - timedelta(days=self.incident_days)
+                    ).only('latitude', 'longitude', 'severity').as_pymongo()
+                ]
+                multipliers = self.graph.risk_multipliers(zones, incidents, self.incident_radius)
+                self._costs = np.asarray(self.graph.lengths, dtype=np.float32) * multipliers
+                self._costs_at = time.monotonic()
+        return self._costs
+
+    def route(self, origin, destination, safest=True):
+        graph = self.graph
+        source, source_gap = graph.nearest_node(*origin)
+        target, target_gap = graph.nearest_node(*destination)
+        if max(source_gap, target_gap) > self.max_snap_distance:
+            raise RouteNotFound('Start or destination is outside the street graph')
+        risk_costs = self._risk_costs()
+        path = graph.astar(source, target, risk_costs if safest else graph.lengths)
+
+        distance = 0.0
+        weighted = 0.0
+        for node, next_node in zip(path, path[1:]):
+            start, end = graph.indptr[node], graph.indptr[node + 1]
+            edge = start + int(np.nonzero(graph.indices[start:end] == next_node)[0][0])
+            distance += float(graph.lengths[edge])
+            weighted += float(risk_costs[edge])
+
+        return {
+            'route': [[float(graph.node_lat[node]), float(graph.node_lng[node])] for node in path],
+            'distance': round(distance, 1),
+            'duration': round(distance / WALKING_SPEED),
+            # 0 means the route avoids every known risk; 1 means it doubles its effective length
+            'risk_exposure': round(weighted / distance - 1, 3) if distance else 0.0,
+        }
+
+
+safe_router = SafeRouter(
+    getattr(settings, 'STREET_GRAPH_PATH', None),
+    risk_refresh=getattr(settings, 'ROUTE_RISK_REFRESH', 300),
+    incident_days=getattr(settings, 'ROUTE_INCIDENT_DAYS', 30),
+    incident_radius=getattr(settings, 'ROUTE_INCIDENT_RADIUS', 100),
+    max_snap_distance=getattr(settings, 'ROUTE_MAX_SNAP_DISTANCE', 500),
+)
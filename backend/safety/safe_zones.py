@@ -0,0 +1,188 @@
+"""
+Nearest safe zones (police stations, hospitals, ...) from an in-memory KD-tree.
+
+Zones are stored as 3D unit vectors on the sphere, where straight-line
+(chord) distance grows monotonically with great-circle distance, so a plain
+Euclidean KD-tree returns the same neighbours as haversine would without
+any special cases at the antimeridian or the poles. There is one tree per
+``zone_type`` plus one over every zone; the set is small and rarely edited,
+so trees are simply rebuilt when it changes.
+
+Workers notice edits made elsewhere by checking the zone count and the
+latest ``updated_at`` at most every ``SAFE_ZONE_INDEX_CHECK`` seconds.
+"""
+import heapq
+import math
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .geo import EARTH_RADIUS_M
+from .models import SafeZone
+
+
+def unit_vectors(latitudes, longitudes):
+    phi = np.radians(latitudes)
+    lam = np.radians(longitudes)
+    return np.stack([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)], axis=-1)
+
+
+def chord_for(distance):
+    return 2 * math.sin(min(distance / EARTH_RADIUS_M, math.pi) / 2)
+
+
+def distance_for(chord):
+    return 2 * EARTH_RADIUS_M * math.asin(min(chord / 2, 1.0))
+
+
+class KDTree:
+    """Static, implicitly balanced KD-tree: the median of ``order[lo:hi]`` sits at its middle."""
+
+    def __init__(self, points, leaf_size=8):
+        self.points = np.asarray(points, dtype=float).reshape(-1, 3)
+        self.leaf_size = leaf_size
+        self.order = np.arange(len(self.points))
+        self.axes = {}  # middle position of a split range -> split axis
+        self._build(0, len(self.points))
+        # Plain tuples: per-point math beats NumPy call overhead at this size
+        self.sorted_points = [tuple(point) for point in self.points[self.order].tolist()]
+        self.sorted_order = self.order.tolist()
+
+    def __len__(self):
+        return len(self.points)
+
+    def _build(self, lo, hi):
+        stack = [(lo, hi)]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= self.leaf_size:
+                continue
+            block = self.points[self.order[lo:hi]]
+            axis = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+            mid = (lo + hi) // 2
+            ranked = np.argpartition(block[:, axis], mid - lo)
+            self.order[lo:hi] = self.order[lo:hi][ranked]
+            self.axes[mid] = axis
+            stack += [(lo, mid), (mid + 1, hi)]
+
+    def query(self, point, k, max_chord=2.0):
+        """Up to ``k`` ``(chord, index)`` pairs closest to ``point``, nearest first."""
+        if k < 1:
+            return []
+        best = []  # max-heap of (-chord, index)
+        x = (float(point[0]), float(point[1]), float(point[2]))
+        stack = [(0, len(self.points), 0.0)]  # (lo, hi, lower bound on any chord inside)
+
+        while stack:
+            lo, hi, floor = stack.pop()
+            bound = -best[0][0] if len(best) == k else max_chord
+            if floor > bound:
+                continue
+            if hi - lo <= self.leaf_size:
+                for position in range(lo, hi):
+                    chord = math.dist(x, self.sorted_points[position])
+                    if chord > bound:
+                        continue
+                    item = (-chord, self.sorted_order[position])
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    else:
+                        heapq.heapreplace(best, item)
+                    bound = -best[0][0] if len(best) == k else max_chord
+                continue
+
+            mid = (lo + hi) // 2
+            axis = self.axes[mid]
+            split = self.sorted_points[mid]
+            chord = math.dist(x, split)
+            if chord <= bound:
+                item = (-chord, self.sorted_order[mid])
+                if len(best) < k:
+                    heapq.heappush(best, item)
+                else:
+                    heapq.heapreplace(best, item)
+                bound = -best[0][0] if len(best) == k else max_chord
+
+            gap = x[axis] - split[axis]
+            near, far = ((lo, mid), (mid + 1, hi)) if gap < 0 else ((mid + 1, hi), (lo, mid))
+            # Far side is pushed first so it's popped last, when the bound is tightest
+            if abs(gap) <= bound:
+                stack.append((*far, abs(gap)))
+            stack.append((*near, floor))
+
+        return sorted((-chord, index) for chord, index in best)
+
+
+def zone_entry(zone):
+    return {
+        'id': str(zone['_id']),
+        'name': zone['name'],
+        'zone_type': zone['zone_type'],
+        'latitude': zone['latitude'],
+        'longitude': zone['longitude'],
+    }
+
+
+class SafeZoneLocator:
+    def __init__(self, check_interval=10):
+        self.check_interval = check_interval
+        self._trees = {}  # zone_type (None for all) -> (KDTree, entries)
+        self._fingerprint = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _current_fingerprint(self):
+        latest = SafeZone.objects(is_active=True).order_by('-updated_at').only('updated_at').first()
+        return SafeZone.objects(is_active=True).count(), latest.updated_at if latest else None
+
+    def _ensure_fresh(self):
+        if self._checked_at is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return
+            fingerprint = self._current_fingerprint()
+            if fingerprint != self._fingerprint:
+                self._rebuild()
+                self._fingerprint = fingerprint
+            self._checked_at = time.monotonic()
+
+    def _rebuild(self):
+        zones = list(SafeZone.objects(is_active=True).only(
+            'name', 'zone_type', 'latitude', 'longitude').as_pymongo())
+        groups = {None: zones}
+        for zone in zones:
+            groups.setdefault(zone['zone_type'], []).append(zone)
+
+        self._trees = {
+            zone_type: (
+                KDTree(unit_vectors(
+                    np.array([zone['latitude'] for zone in members], dtype=float),
+                    np.array([zone['longitude'] for zone in members], dtype=float),
+                )),
+                [zone_entry(zone) for zone in members],
+            )
+            for zone_type, members in groups.items()
+        }
+
+    def nearest(self, latitude, longitude, k=3, radius=None, zone_types=None):
+        self._ensure_fresh()
+        point = unit_vectors(latitude, longitude)
+        max_chord = chord_for(radius) if radius is not None else 2.0
+
+        results = []
+        for zone_type in zone_types or [None]:
+            tree, entries = self._trees.get(zone_type, (None, None))
+            if not tree:
+                continue
+            results += [
+                dict(entries[index], distance=round(distance_for(chord), 1))
+                for chord, index in tree.query(point, k, max_chord)
+            ]
+        results.sort(key=lambda entry: entry['distance'])
+        return results[:k]
+
+
+safe_zone_locator = SafeZoneLocator(getattr(settings, 'SAFE_ZONE_INDEX_CHECK', 10))
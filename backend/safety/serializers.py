@@ -0,0 +1,81 @@
+"""
+Fast serializers for raw pymongo documents on hot read paths.
+
+``to_dict()`` needs a fully built mongoengine ``Document`` and formats every
+datetime in Python. These serializers instead take the dicts returned by
+``.only(*serializer.fields).as_pymongo()`` and build the output with one
+dict comprehension over precomputed ``(key, getter)`` pairs, where plain
+fields use a C-level ``dict.get`` call. Datetimes are left as ``datetime``
+objects for the orjson renderer (``safeguard.renderers``), which writes them
+in the same ISO format as ``to_dict()``.
+"""
+from operator import methodcaller
+
+
+def document_id(d):
+    return str(d['_id'])
+
+
+class CompiledSerializer:
+    def __init__(self, name, fields, expressions=None, defaults=None):
+        """``fields`` are copied as-is; ``expressions`` map output keys to functions of the document."""
+        expressions = dict(expressions or {})
+        defaults = defaults or {}
+        expressions.setdefault('id', document_id)
+        self.name, self.defaults = name, defaults
+        self.expressions = expressions
+        self.keys = list(fields) + [key for key in expressions if key not in fields]
+        self._subsets = {}
+
+        self.getters = tuple(
+            (key, expressions[key] if key in expressions else methodcaller('get', key, defaults.get(key)))
+            for key in self.keys
+        )
+        self.fields = [key for key in fields if key != 'id']
+
+    def __call__(self, document):
+        return {key: getter(document) for key, getter in self.getters}
+
+    def many(self, documents):
+        return list(map(self, documents))
+
+    def subset(self, keys):
+        """A serializer for just ``keys`` (plus ``id``), built once per distinct set.
+
+        Raises ValueError on keys this serializer doesn't produce.
+        """
+        keys = frozenset(keys) | {'id'}
+        if keys not in self._subsets:
+            unknown = keys.difference(self.keys)
+            if unknown:
+                raise ValueError(f'Unknown fields: {", ".join(sorted(unknown))}')
+            fields = [key for key in self.keys if key in keys]
+            expressions = {key: expression for key, expression in self.expressions.items() if key in keys}
+            subset = CompiledSerializer(self.name, fields, expressions, self.defaults)
+            if set(expressions) - {'id'}:
+                # Custom expressions may read any of the parent's fields
+                subset.fields = self.fields
+            self._subsets[keys] = subset
+        return self._subsets[keys]
+
+
+sos_alert = CompiledSerializer('sos_alert', [
+    'id', 'user_id', 'user_name', 'latitude', 'longitude', 'address', 'status', 'priority',
+    'message', 'responders', 'nearest_safe_zones', 'created_at', 'updated_at', 'resolved_at',
+], defaults={'status': 'active', 'priority': 'high', 'responders': [], 'nearest_safe_zones': []})
+
+incident_report = CompiledSerializer('incident_report', [
+    'id', 'user_id', 'incident_type', 'severity', 'latitude', 'longitude', 'address', 'description',
+    'incident_time', 'is_anonymous', 'status', 'created_at', 'updated_at',
+], expressions={
+    'user_id': lambda d: None if d.get('is_anonymous') else d.get('user_id'),
+}, defaults={'is_anonymous': False, 'status': 'pending'})
+
+safe_zone = CompiledSerializer('safe_zone', [
+    'id', 'name', 'latitude', 'longitude', 'radius', 'zone_type', 'description', 'is_active', 'created_at',
+], defaults={'radius': 500, 'is_active': True})
+
+risk_zone = CompiledSerializer('risk_zone', [
+    'id', 'name', 'latitude', 'longitude', 'radius', 'risk_level', 'description', 'incident_count',
+    'is_active', 'created_at', 'updated_at',
+], defaults={'radius': 200, 'incident_count': 0, 'is_active': True})
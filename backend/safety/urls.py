@@ -5,9 +5,17 @@ urlpatterns = [
     path('sos-alerts/', views.create_sos_alert, name='create_sos_alert'),
     path('sos-alerts/list/', views.list_sos_alerts, name='list_sos_alerts'),
     path('sos/long-poll/', views.long_poll_sos_alerts, name='long_poll_sos_alerts'),
+    path('sos/long-poll/async/', views.long_poll_sos_alerts_async, name='long_poll_sos_alerts_async'),
+    path('sos/events/', views.sos_event_stream, name='sos_event_stream'),
+    path('sos/events/ticket/', views.sos_event_ticket, name='sos_event_ticket'),
     path('sos/<str:alert_id>/respond/', views.respond_to_sos, name='respond_to_sos'),
+    path('sos/<str:alert_id>/nearest-volunteers/', views.nearest_volunteers, name='nearest_volunteers'),
+    path('sos/<str:alert_id>/trail/', views.sos_alert_trail, name='sos_alert_trail'),
     path('sos/<str:alert_id>/resolve/', views.resolve_sos_alert, name='resolve_sos_alert'),
     path('reports/create/', views.create_incident_report, name='create_incident_report'),
     path('map-data/', views.get_map_data, name='get_map_data'),
+    path('heatmap/<int:z>/<int:x>/<int:y>/', views.incident_heatmap, name='incident_heatmap'),
+    path('nearest-safe-zones/', views.nearest_safe_zones, name='nearest_safe_zones'),
+    path('safe-route/', views.safe_route, name='safe_route'),
     path('stats/', views.get_safety_stats, name='get_safety_stats'),
 ]
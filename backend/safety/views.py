@@ -2,25 +2,51 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.http import JsonResponse
-from datetime import datetime, timedelta
-import time
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.handlers.wsgi import WSGIRequest
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from datetime import datetime, timedelta, timezone
+import asyncio
 import json
+import logging
+from mongoengine import Q
 from .models import SOSAlert, IncidentReport, SafeZone, RiskZone
-from accounts.models import User
+from .notifications import sos_hub
+from .dispatch import volunteer_locator
+from .geo import Viewport
+from .clustering import cluster_cache
+from . import risk_engine
+from . import serializers
+from .heatmap import heatmap_tiles
+from .routing import safe_router, RouteNotFound
+from .safe_zones import safe_zone_locator
+from .layer_cache import layer_cache
+from .archive import history_querysets
+from accounts.models import User, LocationTrail
+from accounts.authentication import authenticate_request, issue_stream_ticket
+from accounts.location_buffer import location_buffer
 from django.conf import settings
+from safeguard import counters, changes
+from safeguard.streaming import wants_stream, materialize, streaming_response, json_response
+from safeguard.pagination import paginate_merged
+from safeguard.versions import conditional
+
+logger = logging.getLogger(__name__)
+
+def _publish(event, alert):
+    try:
+        sos_hub.publish(event, alert.to_dict())
+    except Exception:
+        # The alert is already saved; waiters pick it up on their next query
+        logger.exception('Publishing SOS %s event failed', event)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_sos_alert(request):
     try:
-        user_id = user = request.user
-        user_id = str(user.id)  # or user.pk
-
-        user = User.objects(id=user_id).first()
-        
-        if not user:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        user = request.user
+        user_id = str(user.id)
         
         # Check if user has an active SOS alert
         active_alert = SOSAlert.objects(user_id=user_id, status='active').first()
@@ -34,6 +60,18 @@ def create_sos_alert(request):
         if not latitude or not longitude:
             return Response({'error': 'Location coordinates required'}, status=status.HTTP_400_BAD_REQUEST)
         
+        try:
+            nearest_safe_zones = safe_zone_locator.nearest(
+                float(latitude),
+                float(longitude),
+                k=getattr(settings, 'SOS_SAFE_ZONE_COUNT', 3),
+                radius=getattr(settings, 'SOS_SAFE_ZONE_RADIUS', 10000)
+            )
+        except Exception:
+            # Never hold up an SOS over the help-point lookup
+            logger.exception('Safe zone lookup failed')
+            nearest_safe_zones = []
+        
         # Create SOS alert
         sos_alert = SOSAlert(
             user_id=user_id,
@@ -42,30 +80,52 @@ def create_sos_alert(request):
             longitude=float(longitude),
             address=request.data.get('address', ''),
             message=message,
-            priority='high'
+            priority='high',
+            nearest_safe_zones=nearest_safe_zones
         )
         sos_alert.save()
+        _publish('created', sos_alert)
         
-        # Update user location
+        # Update user location (write-behind, see accounts.location_buffer)
         user.current_latitude = float(latitude)
         user.current_longitude = float(longitude)
         user.last_location_update = datetime.utcnow()
-        user.save()
+        location_buffer.record(user_id, user.current_latitude, user.current_longitude, user.last_location_update)
+        volunteer_locator.update(user)
+        
+        nearest_volunteers = volunteer_locator.nearest(
+            sos_alert.latitude,
+            sos_alert.longitude,
+            k=getattr(settings, 'SOS_DISPATCH_COUNT', 5),
+            radius=getattr(settings, 'SOS_DISPATCH_RADIUS', 5000),
+            exclude={user_id}
+        )
         
         return Response({
             'message': 'SOS alert created successfully',
-            'alert': sos_alert.to_dict()
+            'alert': sos_alert.to_dict(),
+            'nearest_volunteers': nearest_volunteers
         }, status=status.HTTP_201_CREATED)
     
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _parse_last_check(request):
+    last_check = request.GET.get('last_check')
+    if last_check:
+        return datetime.fromisoformat(last_check.replace('Z', '+00:00'))
+    return datetime.utcnow() - timedelta(minutes=5)
+
+def _changed_alerts(last_check):
+    # Closed alerts are included so pollers can drop them
+    alerts = SOSAlert.objects(updated_at__gte=last_check).order_by('-created_at')
+    return [alert.to_dict() for alert in alerts]
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def long_poll_sos_alerts(request):
     try:
         user = request.user  # Now this is your MongoEngine User instance
-        user_id = str(user.id)
         
         if not user:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -73,30 +133,23 @@ def long_poll_sos_alerts(request):
         if user.role not in ['volunteer', 'admin']:
             return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
 
-        last_check = request.GET.get('last_check')
-        if last_check:
-            last_check = datetime.fromisoformat(last_check.replace('Z', '+00:00'))
-        else:
-            last_check = datetime.utcnow() - timedelta(minutes=5)
-
-        timeout = getattr(settings, 'LONG_POLL_TIMEOUT', 10)  # Add defaults
-        check_interval = getattr(settings, 'LONG_POLL_CHECK_INTERVAL', 2)
-        start_time = time.time()
-
-        while time.time() - start_time < timeout:
-            alerts = SOSAlert.objects(
-                updated_at__gte=last_check,
-                status__in=['active', 'responded']
-            ).order_by('-created_at')
+        last_check = _parse_last_check(request)
+        timeout = getattr(settings, 'LONG_POLL_TIMEOUT', 10)
+        deadline = datetime.utcnow() + timedelta(seconds=timeout)
 
-            if alerts:
-                alerts_data = [alert.to_dict() for alert in alerts]
+        # Query once, then sleep on the hub until an SOS write wakes us up
+        while True:
+            sequence = sos_hub.sequence
+            alerts_data = _changed_alerts(last_check)
+            if alerts_data:
                 return Response({
                     'alerts': alerts_data,
                     'timestamp': datetime.utcnow().isoformat()
                 })
 
-            time.sleep(check_interval)
+            remaining = (deadline - datetime.utcnow()).total_seconds()
+            if remaining <= 0 or not sos_hub.wait(sequence, remaining):
+                break
 
         return Response({
             'alerts': [],
@@ -106,17 +159,130 @@ def long_poll_sos_alerts(request):
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+async def long_poll_sos_alerts_async(request):
+    """ASGI long-poll: waiters park on the hub without holding a worker thread."""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    try:
+        user = await sync_to_async(authenticate_request, thread_sensitive=False)(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({'error': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+
+    if not user:
+        return JsonResponse({'error': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    if user.role not in ['volunteer', 'admin']:
+        return JsonResponse({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        last_check = _parse_last_check(request)
+        timeout = getattr(settings, 'LONG_POLL_TIMEOUT', 10)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while True:
+            sequence = sos_hub.sequence
+            alerts_data = await sync_to_async(_changed_alerts, thread_sensitive=False)(last_check)
+            if alerts_data:
+                return JsonResponse({
+                    'alerts': alerts_data,
+                    'timestamp': datetime.utcnow().isoformat()
+                })
+
+            remaining = deadline - loop.time()
+            if remaining <= 0 or not await sos_hub.wait_async(sequence, remaining):
+                break
+
+        return JsonResponse({
+            'alerts': [],
+            'timestamp': datetime.utcnow().isoformat()
+        })
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _open_alerts():
+    alerts = SOSAlert.objects(status__in=['active', 'responded']).order_by('-created_at')
+    return [alert.to_dict() for alert in alerts]
+
+def _sse_message(event_id, event, data):
+    return f'id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n'
+
+async def _sos_event_source(last_event_id):
+    heartbeat = getattr(settings, 'SSE_HEARTBEAT_INTERVAL', 15)
+    yield 'retry: 3000\n\n'
+
+    since = sos_hub.parse_event_id(last_event_id)
+    while True:
+        events = None if since is None else sos_hub.events_since(since)
+
+        if events is None:
+            # New client, restarted process or buffer overrun: resend full state
+            since = sos_hub.sequence
+            alerts = await sync_to_async(_open_alerts, thread_sensitive=False)()
+            yield _sse_message(sos_hub.event_id(since), 'snapshot', {'alerts': alerts})
+            continue
+
+        for sequence, event, payload in events:
+            since = sequence
+            yield _sse_message(sos_hub.event_id(sequence), event, {'alert': payload})
+
+        if not events and not await sos_hub.wait_async(since, heartbeat):
+            yield ': keepalive\n\n'
+
+async def sos_event_stream(request):
+    """Server-Sent Events feed of SOS alert changes for the SOS monitor (ASGI only)."""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    if isinstance(request, WSGIRequest):
+        # A WSGI server would buffer the endless async stream and never answer;
+        # fail fast so the monitor falls back to long-polling
+        return JsonResponse({'error': 'Event stream requires an ASGI server, use sos/long-poll/'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    try:
+        # EventSource cannot set headers, so it authenticates with a single-use ?ticket=
+        user = await sync_to_async(authenticate_request, thread_sensitive=False)(request, allow_ticket=True)
+    except AuthenticationFailed as e:
+        return JsonResponse({'error': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+
+    if not user:
+        return JsonResponse({'error': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    if user.role not in ['volunteer', 'admin']:
+        return JsonResponse({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    response = StreamingHttpResponse(_sos_event_source(last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
-def respond_to_sos(request, alert_id):
+def sos_event_ticket(request):
     try:
-        user_id = user = request.user
-        user_id = str(user.id)  # or user.pk
+        user = request.user
+        if user.role not in ['volunteer', 'admin']:
+            return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+        
+        ticket, ttl = issue_stream_ticket(user)
+        return Response({'ticket': ticket, 'expires_in': ttl})
+    
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        user = User.objects(id=user_id).first()
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def respond_to_sos(request, alert_id):
+    try:
+        user = request.user
+        user_id = str(user.id)
         
-        if not user or user.role != 'volunteer':
+        if user.role != 'volunteer':
             return Response({'error': 'Only volunteers can respond to SOS alerts'}, status=status.HTTP_403_FORBIDDEN)
         
         alert = SOSAlert.objects(id=alert_id).first()
@@ -131,6 +297,7 @@ def respond_to_sos(request, alert_id):
             alert.responders.append(user_id)
             alert.status = 'responded'
             alert.save()
+            _publish('responded', alert)
         
         return Response({
             'message': 'Response recorded successfully',
@@ -140,14 +307,91 @@ def respond_to_sos(request, alert_id):
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def nearest_volunteers(request, alert_id):
+    try:
+        user = request.user
+        user_id = str(user.id)
+        
+        alert = SOSAlert.objects(id=alert_id).first()
+        if not alert:
+            return Response({'error': 'SOS alert not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        if alert.user_id != user_id and user.role not in ['volunteer', 'admin']:
+            return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+        
+        k = max(1, min(int(request.GET.get('k', getattr(settings, 'SOS_DISPATCH_COUNT', 5))), 50))
+        radius = float(request.GET.get('radius', getattr(settings, 'SOS_DISPATCH_RADIUS', 5000)))
+        
+        volunteers = volunteer_locator.nearest(
+            alert.latitude, alert.longitude, k=k, radius=radius, exclude={alert.user_id}
+        )
+        
+        return Response({
+            'alert_id': alert_id,
+            'volunteers': volunteers
+        })
+    
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sos_alert_trail(request, alert_id):
+    try:
+        user = request.user
+        user_id = str(user.id)
+        
+        alert = SOSAlert.objects(id=alert_id).first()
+        if not alert:
+            return Response({'error': 'SOS alert not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        if alert.user_id != user_id and user.role not in ['volunteer', 'admin']:
+            return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+        
+        # Trail for the alert's lifetime; `since` lets trackers fetch only new points
+        start = alert.created_at
+        since = request.GET.get('since')
+        if since:
+            try:
+                since = datetime.fromisoformat(since.replace('Z', '+00:00'))
+            except ValueError:
+                return Response({'error': 'since must be an ISO 8601 timestamp'}, status=status.HTTP_400_BAD_REQUEST)
+            if since.tzinfo:
+                since = since.astimezone(timezone.utc).replace(tzinfo=None)
+            start = max(start, since)
+        
+        points = LocationTrail.points_between(
+            alert.user_id,
+            start,
+            alert.resolved_at,
+            getattr(settings, 'LOCATION_HISTORY_BUCKET_SECONDS', 60)
+        )
+        # Pings still waiting in this worker's write-behind buffer
+        stored = {point['timestamp'] for point in points}
+        buffered = [
+            point for point in location_buffer.history(alert.user_id, start, alert.resolved_at)
+            if point['timestamp'] not in stored
+        ]
+        if buffered:
+            points = sorted(points + buffered, key=lambda point: point['timestamp'])
+        
+        return Response({
+            'alert_id': alert_id,
+            'user_id': alert.user_id,
+            'points': points
+        })
+    
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def resolve_sos_alert(request, alert_id):
     try:
-        user_id = user = request.user
-        user_id = str(user.id)  # or user.pk
-
-        user = User.objects(id=user_id).first()
+        user = request.user
+        user_id = str(user.id)
         
         alert = SOSAlert.objects(id=alert_id).first()
         if not alert:
@@ -160,6 +404,7 @@ def resolve_sos_alert(request, alert_id):
         alert.status = 'resolved'
         alert.resolved_at = datetime.utcnow()
         alert.save()
+        _publish('resolved', alert)
         
         return Response({
             'message': 'SOS alert resolved successfully',
@@ -183,6 +428,16 @@ def create_incident_report(request):
             if not request.data.get(field):
                 return Response({'error': f'{field} is required'}, status=status.HTTP_400_BAD_REQUEST)
         
+        try:
+            incident_time = datetime.fromisoformat(request.data['incident_time'].replace('Z', '+00:00'))
+        except ValueError:
+            return Response({'error': 'incident_time must be an ISO 8601 timestamp'}, status=status.HTTP_400_BAD_REQUEST)
+        if incident_time.tzinfo:
+            incident_time = incident_time.astimezone(timezone.utc).replace(tzinfo=None)
+        # A few minutes of slack for client clock skew
+        if incident_time > datetime.utcnow() + timedelta(minutes=5):
+            return Response({'error': 'incident_time cannot be in the future'}, status=status.HTTP_400_BAD_REQUEST)
+        
         incident_report = IncidentReport(
             user_id=None if is_anonymous else user_id,
             incident_type=request.data['incident_type'],
@@ -191,11 +446,18 @@ def create_incident_report(request):
             longitude=float(request.data['longitude']),
             address=request.data.get('address', ''),
             description=request.data['description'],
-            incident_time=datetime.fromisoformat(request.data['incident_time'].replace('Z', '+00:00')),
+            incident_time=incident_time,
             is_anonymous=is_anonymous
         )
         incident_report.save()
         
+        try:
+            risk_engine.record_incident(incident_report)
+        except Exception:
+            # The report is stored; `rebuild_risk_zones --full` can catch the cell up later
+            logger.exception('Risk engine update failed')
+        heatmap_tiles.invalidate_point(incident_report.latitude, incident_report.longitude)
+        
         return Response({
             'message': 'Incident report created successfully',
             'report': incident_report.to_dict()
@@ -204,118 +466,321 @@ def create_incident_report(request):
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _map_volunteer(vol):
+    # Prefer pings still waiting in the write-behind buffer
+    buffered = location_buffer.position(vol['_id'])
+    latitude, longitude, last_update = buffered or (vol['current_latitude'], vol['current_longitude'], vol.get('last_location_update'))
+    return {
+        'id': str(vol['_id']),
+        'name': vol['name'],
+        'latitude': latitude,
+        'longitude': longitude,
+        'last_update': last_update
+    }
+
+def _map_changes(user, cursor, viewport):
+    """Map items written since ``cursor``, with the ids that left the map under ``removed``.
+
+    With a viewport only zones and alerts inside it (or without a position)
+    are looked at. Volunteers move, so every changed one is checked and those
+    now outside the viewport are reported as removed.
+    """
+    since = changes.changed_since(cursor)
+    data = {'cursor': changes.new_cursor(), 'removed': {}}
+    
+    def changed_documents(model):
+        if viewport is None:
+            return model.objects(__raw__=since)
+        near = Q(**viewport.query()) | Q(location=None)
+        return model.objects(__raw__={'$and': [since, model.objects(near)._query]})
+    
+    # (layer, collection, changed documents, serializer, whether a raw document is still on the map)
+    layers = [
+        ('safe_zones', 'safe_zones', changed_documents(SafeZone).only(*serializers.safe_zone.fields),
+         serializers.safe_zone, lambda doc: doc.get('is_active', True)),
+        ('risk_zones', 'risk_zones', changed_documents(RiskZone).only(*serializers.risk_zone.fields),
+         serializers.risk_zone, lambda doc: doc.get('is_active', True)),
+    ]
+    if user.role in ['volunteer', 'admin']:
+        alerts = changed_documents(SOSAlert).only(*serializers.sos_alert.fields)
+        layers.append(('sos_alerts', 'sos_alerts', alerts, serializers.sos_alert,
+                       lambda doc: doc.get('status', 'active') in ['active', 'responded']))
+    if user.role in ['user', 'admin']:
+        volunteers = User.objects(role='volunteer', __raw__=since).only(
+            'name', 'current_latitude', 'current_longitude', 'last_location_update', 'is_verified', 'is_active',
+            'share_location'
+        )
+        layers.append(('volunteers', 'users', volunteers, _map_volunteer,
+                       lambda doc: doc.get('is_verified') and doc.get('is_active', True)
+                       and doc.get('share_location') is not False
+                       and doc.get('current_latitude') is not None and doc.get('current_longitude') is not None))
+    
+    for layer, collection, documents, serialize, on_map in layers:
+        changed, removed = [], changes.deleted_since(collection, cursor)
+        for document in documents.as_pymongo():
+            item = serialize(document) if on_map(document) else None
+            if item and (viewport is None or viewport.contains(item['latitude'], item['longitude'])):
+                changed.append(item)
+            else:
+                removed.append(str(document['_id']))
+        data[layer] = changed
+        data['removed'][layer] = removed
+    return data
+
+def _map_collections(request):
+    # Volunteer positions are versioned apart from 'users' (see accounts.location_buffer)
+    names = ['safe_zones', 'risk_zones', 'incident_reports']
+    if request.user.role in ['volunteer', 'admin']:
+        names.append('sos_alerts')
+    if request.user.role in ['user', 'admin']:
+        names += ['users', 'volunteer_locations']
+    return names
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+# Clusters come from their own cache, so the ETag also rolls over with it
+@conditional(_map_collections, refresh=getattr(settings, 'MAP_CLUSTER_CACHE_TTL', 60))
 def get_map_data(request):
-    print("DEBUG: request.user =", request.user)
     try:
-        user_id = str(request.user.id)
-        print("DEBUG: user_id =", user_id)
-        user = User.objects(id=user_id).first()
-        print("DEBUG: found user =", user)
-        if not user:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        user = request.user
+        user_id = str(user.id)
         
-        data = {}
+        # Optional viewport (bbox or center+radius) so only visible items are loaded
+        # and, when zoomed out, dense layers aggregated into grid-cell clusters
+        try:
+            viewport = Viewport.from_params(request.GET)
+            zoom = int(request.GET['zoom']) if request.GET.get('zoom') else None
+            if zoom is not None and not 0 <= zoom <= 22:
+                raise ValueError('zoom must be between 0 and 22')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        in_view = viewport.query() if viewport else {}
+        clustered = zoom is not None and zoom < getattr(settings, 'MAP_CLUSTER_MAX_ZOOM', 13)
+        
+        # ?since=<cursor from an earlier response>: only what changed, plus removals
+        if request.GET.get('since'):
+            try:
+                cursor = changes.decode_cursor(request.GET['since'])
+            except changes.CursorExpired as e:
+                return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if clustered:
+                return Response({'error': 'since is not supported for clustered zoom levels'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(_map_changes(user, cursor, viewport))
+        
+        data = {'cursor': changes.new_cursor()}
+        
+        # Dynamic layers are read as projected raw dicts and serialized by safety.serializers;
+        # safe and risk zones come pre-encoded from the versioned layer cache
         
         # Safe zones (visible to all)
-        safe_zones = SafeZone.objects(is_active=True)
-        data['safe_zones'] = [zone.to_dict() for zone in safe_zones]
-        
-        # Risk zones (visible to all)
-        risk_zones = RiskZone.objects(is_active=True)
-        data['risk_zones'] = [zone.to_dict() for zone in risk_zones]
+        data['safe_zones'] = iter(layer_cache.items('safe_zones', viewport))
+        
+        if clustered:
+            data['clusters'] = {
+                'zoom': zoom,
+                'incidents': cluster_cache.clusters('incidents', zoom, viewport),
+                'risk_zones': cluster_cache.clusters('risk_zones', zoom, viewport),
+            }
+            if user.role in ['user', 'admin']:
+                data['clusters']['volunteers'] = cluster_cache.clusters('volunteers', zoom, viewport)
+        else:
+            # Risk zones (visible to all)
+            data['risk_zones'] = iter(layer_cache.items('risk_zones', viewport))
         
         # SOS alerts (visible to volunteers and admins)
         if user.role in ['volunteer', 'admin']:
-            sos_alerts = SOSAlert.objects(status__in=['active', 'responded']).order_by('-created_at')
-            data['sos_alerts'] = [alert.to_dict() for alert in sos_alerts]
+            sos_alerts = SOSAlert.objects(status__in=['active', 'responded'], **in_view).order_by('-created_at')
+            data['sos_alerts'] = map(serializers.sos_alert, sos_alerts.only(*serializers.sos_alert.fields).as_pymongo())
         
         # Nearby volunteers (visible to users and admins)
-        if user.role in ['user', 'admin']:
+        if user.role in ['user', 'admin'] and not clustered:
             volunteers = User.objects(
                 role='volunteer',
                 is_verified=True,
                 is_active=True,
+                share_location__ne=False,
                 current_latitude__exists=True,
-                current_longitude__exists=True
-            )
-            data['volunteers'] = [
-                {
-                    'id': str(vol.id),
-                    'name': vol.name,
-                    'latitude': vol.current_latitude,
-                    'longitude': vol.current_longitude,
-                    'last_update': vol.last_location_update.isoformat() if vol.last_location_update else None
-                }
-                for vol in volunteers
-            ]
-        
-        return Response(data)
+                current_longitude__exists=True,
+                **(viewport.query(latitude='current_latitude') if viewport else {})
+            ).only('name', 'current_latitude', 'current_longitude', 'last_location_update').as_pymongo()
+            data['volunteers'] = map(_map_volunteer, volunteers)
+        
+        # Layers are iterators over the cursors: ?stream=1 writes them out as they're read
+        if wants_stream(request):
+            return streaming_response(data)
+        return json_response(data)
     
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def get_safety_stats(request):
+def incident_heatmap(request, z, x, y):
     try:
-        user_id = user = request.user
-        user_id = str(user.id)  # or user.pk
+        if not 0 <= z <= 20 or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return Response({'error': 'Invalid tile coordinates'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        incident_types = [value for value in request.GET.get('incident_type', '').split(',') if value]
+        severities = [value for value in request.GET.get('severity', '').split(',') if value]
+        try:
+            since = request.GET.get('since')
+            since = datetime.fromisoformat(since.replace('Z', '+00:00')) if since else None
+            until = request.GET.get('until')
+            until = datetime.fromisoformat(until.replace('Z', '+00:00')) if until else None
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        tile = heatmap_tiles.tile(z, x, y, sorted(incident_types), sorted(severities), since, until)
+        return Response(tile)
+    
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        user = User.objects(id=user_id).first()
-        
-        if not user:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        stats = {}
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def nearest_safe_zones(request):
+    try:
+        try:
+            latitude = float(request.GET['latitude'])
+            longitude = float(request.GET['longitude'])
+            k = max(1, min(int(request.GET.get('k', 3)), 50))
+            radius = request.GET.get('radius')
+            radius = float(radius) if radius else None
+        except (KeyError, ValueError):
+            return Response({'error': 'latitude and longitude are required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        zone_types = [value for value in request.GET.get('zone_type', '').split(',') if value]
+        valid_types = [choice for choice, _ in SafeZone.zone_type.choices]
+        if any(zone_type not in valid_types for zone_type in zone_types):
+            return Response({'error': f'zone_type must be one of {", ".join(valid_types)}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        zones = safe_zone_locator.nearest(latitude, longitude, k=k, radius=radius, zone_types=zone_types)
+        return Response({'safe_zones': zones})
+    
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def safe_route(request):
+    try:
+        if not safe_router.available:
+            return Response({'error': 'Routing is not configured'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        mode = request.GET.get('mode', 'safest')
+        if mode not in ('safest', 'shortest'):
+            return Response({'error': 'mode must be safest or shortest'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            origin = tuple(float(value) for value in request.GET['from'].split(','))
+            destination = tuple(float(value) for value in request.GET['to'].split(','))
+            if len(origin) != 2 or len(destination) != 2:
+                raise ValueError
+        except (KeyError, ValueError):
+            return Response({'error': 'from and to must be lat,lng'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            route = safe_router.route(origin, destination, safest=mode == 'safest')
+        except RouteNotFound as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        
+        route['mode'] = mode
+        return Response(route)
+    
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional('safe_zones', 'users', 'sos_alerts', 'incident_reports')
+def get_safety_stats(request):
+    try:
+        user = request.user
+        user_id = str(user.id)
         
-        # Basic stats for all users
-        stats['safe_zones_count'] = SafeZone.objects(is_active=True).count()
-        stats['active_volunteers'] = User.objects(role='volunteer', is_verified=True, is_active=True).count()
+        # Materialized counters (safeguard.counters): one read whatever the role
+        names = {
+            'safe_zones_count': 'safe_zones:active',
+            'active_volunteers': 'users:volunteers_verified',
+        }
         
         # Role-specific stats
         if user.role == 'user':
-            stats['user_alerts'] = SOSAlert.objects(user_id=user_id).count()
-            stats['user_reports'] = IncidentReport.objects(user_id=user_id).count()
+            names['user_alerts'] = f'sos_alerts:user:{user_id}'
+            names['user_reports'] = f'incident_reports:user:{user_id}'
         
         elif user.role == 'volunteer':
-            stats['active_alerts'] = SOSAlert.objects(status='active').count()
-            stats['responded_alerts'] = SOSAlert.objects(responders=user_id).count()
+            names['active_alerts'] = 'sos_alerts:active'
+            names['responded_alerts'] = f'sos_alerts:responder:{user_id}'
         
         elif user.role == 'admin':
-            stats['total_users'] = User.objects(is_active=True).count()
-            stats['total_alerts'] = SOSAlert.objects().count()
-            stats['total_reports'] = IncidentReport.objects().count()
-            stats['pending_volunteers'] = User.objects(role='volunteer', is_verified=False).count()
+            names['total_users'] = 'users:active'
+            names['total_alerts'] = 'sos_alerts'
+            names['total_reports'] = 'incident_reports'
+            names['pending_volunteers'] = 'users:volunteers_pending'
         
-        return Response(stats)
+        values = counters.read(names.values())
+        return Response({stat: values[name] for stat, name in names.items()})
     
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+SOS_LIST_MAX_LIMIT = 200
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional('sos_alerts', 'sos_alerts_archive')
 def list_sos_alerts(request):
     try:
-        user_id = user = request.user
-        user_id = str(user.id)  # or user.pk
-
-        user = User.objects(id=user_id).first()
+        user = request.user
+        user_id = str(user.id)
 
-        if not user:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            limit = max(1, min(int(request.GET.get('limit', 50)), SOS_LIST_MAX_LIMIT))
+            # ?fields=latitude,longitude,status for lighter list views (id is always included)
+            fields = request.GET.get('fields')
+            serializer = serializers.sos_alert.subset(fields.split(',')) if fields else serializers.sos_alert
+            updated_since = request.GET.get('updated_since')
+            if updated_since:
+                updated_since = datetime.fromisoformat(updated_since.replace('Z', '+00:00'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         # Allow volunteers and admins to see alerts
         if user.role in ['volunteer', 'admin']:
-            alerts = SOSAlert.objects(status__in=['active', 'responded']).order_by('-created_at')
+            # Polling with updated_since also returns alerts that were closed, so clients can drop them
+            statuses = [choice for choice, _ in SOSAlert.STATUS_CHOICES] if updated_since else ['active', 'responded']
+            querysets = [SOSAlert.objects(status__in=statuses)]
+        elif updated_since:
+            querysets = [SOSAlert.objects(user_id=user_id)]
         else:
-            # Users can only see their own alerts
-            alerts = SOSAlert.objects(user_id=user_id).order_by('-created_at')
+            # Users can only see their own alerts; their full history spans the archive too
+            querysets = history_querysets(user_id=user_id)
+
+        if updated_since:
+            querysets = [alerts.filter(updated_at__gt=updated_since) for alerts in querysets]
+            # Oldest change first: an alert updated while paging moves behind the cursor instead of being skipped
+            order = ['updated_at', 'id']
+        else:
+            order = ['-created_at', '-id']
+
+        projection = set(serializer.fields) | {order[0].lstrip('-')}
+        querysets = [alerts.only(*projection).as_pymongo() for alerts in querysets]
+        try:
+            alerts, next_cursor = paginate_merged(querysets, order, limit, request.GET.get('cursor'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        alert_list = [alert.to_dict() for alert in alerts]
-        return Response({'alerts': alert_list}, status=status.HTTP_200_OK)
+        data = {
+            'alerts': map(serializer, alerts),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+        }
+        if wants_stream(request):
+            return streaming_response(data)
+        return Response(materialize(data), status=status.HTTP_200_OK)
 
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
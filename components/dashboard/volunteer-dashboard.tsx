@@ -131,7 +131,7 @@ const handleResolveAlert = async (alertId: string) => {
   useEffect(() => {
 const fetchSOSAlerts = async () => {
   try {
-    const response = await apiClient.getSOSAlerts();
+    const response = await apiClient.getAllSOSAlerts();
 
     if (
       response.success &&
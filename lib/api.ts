@@ -165,8 +165,38 @@ class ApiClient {
   }
 
   // Inside ApiClient class
-async getSOSAlerts(): Promise<ApiResponse<{alerts: any[]}>> {
-  return this.request("/safety/sos-alerts/list/");
+// params: limit, cursor (next_cursor of the previous page), fields (comma-separated), updated_since (ISO time)
+async getSOSAlerts(
+  params: Record<string, string> = {},
+): Promise<ApiResponse<{ alerts: any[]; next_cursor: string | null; has_more: boolean }>> {
+  const query = new URLSearchParams(params).toString()
+  return this.request(`/safety/sos-alerts/list/${query ? `?${query}` : ""}`);
+}
+// Every page of getSOSAlerts, following next_cursor until the last one
+async getAllSOSAlerts(
+  params: Record<string, string> = {},
+): Promise<ApiResponse<{ alerts: any[] }>> {
+  const alerts: any[] = [];
+  let cursor: string | null = null;
+  do {
+    const response = await this.getSOSAlerts(cursor ? { ...params, cursor } : params);
+    if (!response.success || !response.data) return { ...response, data: undefined };
+    alerts.push(...response.data.alerts);
+    cursor = response.data.next_cursor;
+  } while (cursor);
+  return { success: true, data: { alerts } };
+}
+async getSOSEventStreamUrl(lastEventId?: string): Promise<string | null> {
+  // EventSource cannot send an Authorization header: trade the JWT for a short-lived single-use ticket
+  const response = await this.request<{ ticket: string }>("/safety/sos/events/ticket/", { method: "POST" });
+  if (!response.success || !response.data) return null;
+  const params = new URLSearchParams({ ticket: response.data.ticket });
+  if (lastEventId) params.set("last_event_id", lastEventId);
+  return `${this.baseURL}/safety/sos/events/?${params}`;
+}
+async longPollSOSAlerts(lastCheck?: string): Promise<ApiResponse<{ alerts: any[]; timestamp: string }>> {
+  const query = lastCheck ? `?last_check=${encodeURIComponent(lastCheck)}` : "";
+  return this.request(`/safety/sos/long-poll/${query}`);
 }
 async respondToSOSAlert(alertId: string): Promise<ApiResponse<{alerts: any[]}>> {
   return this.request(`/safety/sos/${alertId}/respond/`, {
@@ -216,19 +246,60 @@ async getSafetyStats(): Promise<ApiResponse<any>> {
   }
 
   // Map Data APIs
-  async getMapData(): Promise<
+  // Pass { bbox: "west,south,east,north" } or { center: "lat,lng", radius: "meters" } to load only the visible area
+  async getMapData(params: Record<string, string> = {}): Promise<
     ApiResponse<{
       safe_zones: any[]
       risk_zones: any[]
       recent_incidents: any[]
+      cursor: string
+      removed?: Record<string, string[]>
+    }>
+  > {
+    // Pass `since: <cursor from the previous response>` to get only changes
+    const query = new URLSearchParams(params).toString()
+    return this.request(`/safety/map-data/${query ? `?${query}` : ""}`)
+  }
+
+  async getNearestSafeZones(
+    latitude: number,
+    longitude: number,
+    options: { k?: number; radius?: number; zoneTypes?: string[] } = {},
+  ): Promise<ApiResponse<{ safe_zones: any[] }>> {
+    const params: Record<string, string> = { latitude: String(latitude), longitude: String(longitude) }
+    if (options.k) params.k = String(options.k)
+    if (options.radius) params.radius = String(options.radius)
+    if (options.zoneTypes?.length) params.zone_type = options.zoneTypes.join(",")
+    return this.request(`/safety/nearest-safe-zones/?${new URLSearchParams(params).toString()}`)
+  }
+
+  async getSafeRoute(
+    from: [number, number],
+    to: [number, number],
+    mode: "safest" | "shortest" = "safest",
+  ): Promise<
+    ApiResponse<{
+      route: [number, number][]
+      distance: number
+      duration: number
+      risk_exposure: number
+      mode: string
     }>
   > {
-    return this.request("/safety/map-data/")
+    const query = new URLSearchParams({ from: from.join(","), to: to.join(","), mode }).toString()
+    return this.request(`/safety/safe-route/?${query}`)
   }
 
   // Community APIs
-  async getCommunityPosts(): Promise<ApiResponse<any[]>> {
-    return this.request("/community/posts/")
+  async getCommunityPosts(
+    params: { cursor?: string; category?: string; limit?: number } = {},
+  ): Promise<ApiResponse<{ posts: any[]; next_cursor: string | null; has_more: boolean }>> {
+    const query = new URLSearchParams()
+    if (params.cursor) query.set("cursor", params.cursor)
+    if (params.category) query.set("category", params.category)
+    if (params.limit) query.set("limit", String(params.limit))
+    const queryString = query.toString()
+    return this.request(`/community/posts/${queryString ? `?${queryString}` : ""}`)
   }
 
   async createCommunityPost(postData: {